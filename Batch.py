@@ -0,0 +1,123 @@
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+
+from Graph import Graph
+from ParallelSim import workerPool
+
+# The columns of the CSV report, the JSONL report also has the cell types and the outputs
+reportFields = ["design", "file", "status", "error", "inputs", "outputs", "cells", "nets",
+                "depth", "parseSeconds", "constructSeconds", "simulateSeconds", "vectors",
+                "outputHash"]
+
+
+def designFiles(pattern):
+    """
+    Find the netlists of a batch
+    Input:
+    - pattern: A directory, a glob pattern or a .vm file
+    Output:
+    - returns the sorted paths of the .vm files
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.vm")
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def runDesign(task):
+    """
+    Parse, construct and simulate one netlist of a batch, the errors are reported, not raised
+    Input:
+    - task: The (path, number of random vectors, seed, cache directory) of the design
+    Output:
+    - record: The results and timings of the design
+    """
+    filePath, count, seed, cacheDir = task
+    record = {"design": os.path.splitext(os.path.basename(filePath))[0], "file": filePath,
+              "status": "ok", "error": ""}
+    try:
+        start = time.perf_counter()
+        graph = Graph.fromFile(filePath, cacheDir=cacheDir)
+        parsed = time.perf_counter()
+        graph.construct(draw=False)
+        constructed = time.perf_counter()
+        netlist = graph.netlist
+        record.update({
+            "inputs": len(graph.dataTypes["input"]),
+            "outputs": len(graph.dataTypes["output"]),
+            "cells": len(netlist.cellNames),
+            "nets": len(netlist.netNames),
+            "depth": max(netlist.levels) + 1 if len(netlist.levels) > 0 else 0,
+            "parseSeconds": round(parsed - start, 6),
+            "constructSeconds": round(constructed - parsed, 6)
+        })
+        # The random vectors only depend on the seed and the name of the design
+        rng = random.Random(f"{seed}:{record['design']}")
+        length = len(graph.dataTypes["input"])
+        vectors = [format(rng.getrandbits(length), f"0{length}b") if length > 0 else ""
+                   for i in range(count)]
+        out = graph.simulateBatch(vectors) if count > 0 else []
+        rows = ["".join(str(bit) for bit in row) for row in out]
+        record.update({
+            "simulateSeconds": round(time.perf_counter() - constructed, 6),
+            "vectors": count,
+            "outputHash": hashlib.sha256("\n".join(rows).encode()).hexdigest()[:16],
+            "cellTypes": dict(Counter(graph.cellTypes.values())),
+            "outputNames": graph.dataTypes["output"],
+            "responses": rows
+        })
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+def runBatch(paths, fp, fmt="json", count=1024, seed=0, workers=None, cacheDir=None):
+    """
+    Run a batch of netlists across a process pool and stream a report of every design
+    A design that fails is reported with its error and the batch goes on
+    Input:
+    - paths: The paths of the .vm files
+    - fp: The file the report is written to, as each design finishes
+    - fmt: json for one JSON record per line, csv for the reportFields columns
+    - count: The number of random vectors simulated per design
+    - seed: The seed of the random vectors
+    - workers: The number of processes, all the cores if None, in-process if 1
+    - cacheDir: The directory of the parsed netlist cache, no caching if None
+    Output:
+    - records: The records of the designs, in the order they finished
+    """
+    # The largest designs are started first so that they do not finish last alone
+    tasks = [(path, count, seed, cacheDir)
+             for path in sorted(paths, key=os.path.getsize, reverse=True)]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(tasks)))
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(fp, reportFields, extrasaction="ignore")
+        writer.writeheader()
+    records = []
+
+    def write(record):
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            fp.write(json.dumps(record) + "\n")
+        fp.flush()
+        records.append(record)
+
+    if workers == 1:
+        for task in tasks:
+            write(runDesign(task))
+    else:
+        with workerPool(workers) as pool:
+            for record in pool.imap_unordered(runDesign, tasks):
+                write(record)
+    return records
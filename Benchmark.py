@@ -0,0 +1,230 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from Graph import Graph
+
+# The phases of the benchmark, in the order they are run on a design
+phases = ("parse", "construct", "simulate", "draw", "tmr")
+# A phase is flagged when its median time grows by more than this fraction of the baseline
+regressionThreshold = 0.2
+defaultDesigns = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vm files", "*.vm")
+
+
+def parseArgs():
+    """
+    A function that parses the command line arguments
+    Output:
+    - returns the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the phases of the NetList Viewer and Simulator on the bundled netlists.")
+    parser.add_argument("designs", nargs="*", default=[defaultDesigns],
+                        help="the .vm files or glob patterns (default: vm files/*.vm)")
+    parser.add_argument("-p", "--phases", nargs="+", choices=phases, default=list(phases),
+                        help="the phases to run (default: all)")
+    parser.add_argument("-w", "--warmup", type=int, default=1,
+                        help="untimed runs of each phase before the timed ones (default: 1)")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+                        help="timed runs of each phase (default: 3)")
+    parser.add_argument("-n", "--vectors", type=int, default=1 << 14,
+                        help="random vectors of the simulate phase (default: 16384)")
+    parser.add_argument("--draw-format", choices=["png", "svg", "dot", "graphml"], default="png",
+                        help="format of the draw phase (default: png)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the results as JSON to this file")
+    parser.add_argument("-b", "--baseline", default=None,
+                        help="JSON results of an earlier run to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=regressionThreshold,
+                        help=f"slowdown flagged as a regression (default: {regressionThreshold})")
+    return parser.parse_args()
+
+
+def peakRss():
+    """
+    Get the peak resident set size of the process
+    Output:
+    - returns the peak RSS in KiB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def phaseSetup(phase, filePath, vectors, drawFormat):
+    """
+    Get the untimed setup and the timed run of a phase
+    Input:
+    - phase: The phase, see phases
+    - filePath: Path of the .vm file
+    - vectors: The vectors of the simulate phase
+    - drawFormat: The format of the draw phase
+    Output:
+    - returns the setup function and the run function, which takes the result of the setup
+    """
+    def parsed():
+        return Graph.fromFile(filePath)
+
+    def constructed():
+        graph = Graph.fromFile(filePath)
+        graph.construct(draw=False)
+        return graph
+
+    if phase == "parse":
+        return lambda: None, lambda state: parsed()
+    if phase == "construct":
+        return parsed, lambda graph: graph.construct(draw=False)
+    if phase == "simulate":
+        return constructed, lambda graph: graph.simulateBatch(vectors)
+    if phase == "draw":
+        return constructed, lambda graph: graph.draw(drawFormat)
+    return constructed, lambda graph: graph.applyTMR(
+        predicate=lambda name, mod: mod.startswith("CFG") or mod == "ARI1", draw=False)
+
+
+def benchmarkPhase(task):
+    """
+    Run one phase of one design, in a fresh process so that the peak RSS is the phase's own
+    Input:
+    - task: The (path, phase, warmup, repeats, number of vectors, draw format) of the phase
+    Output:
+    - result: The timings of the phase
+    """
+    filePath, phase, warmup, repeats, count, drawFormat = task
+    design = os.path.splitext(os.path.basename(filePath))[0]
+    # The drawings go to the Output folder of a scratch directory
+    workDir = tempfile.mkdtemp(prefix="netlist_bench_")
+    os.chdir(workDir)
+    try:
+        vectors = []
+        if phase == "simulate":
+            length = len(Graph.fromFile(filePath).dataTypes["input"])
+            rng = random.Random(design)
+            vectors = [format(rng.getrandbits(length), f"0{length}b") for i in range(count)]
+        setup, run = phaseSetup(phase, filePath, vectors, drawFormat)
+        times = []
+        for i in range(warmup + repeats):
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            if i >= warmup:
+                times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        return {
+            "design": design,
+            "phase": phase,
+            "min": min(times),
+            "median": median,
+            "mean": statistics.mean(times),
+            # Includes the untimed setup of the phase, e.g. the parse before a simulate
+            "peakRssKb": peakRss(),
+            "vectorsPerSecond": count / median if phase == "simulate" and median > 0 else None
+        }
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+
+def runBenchmark(paths, selected=phases, warmup=1, repeats=3, count=1 << 14, drawFormat="png"):
+    """
+    Benchmark the phases on every design, one phase at a time in a fresh process
+    Input:
+    - paths: The paths of the .vm files
+    - selected: The phases to run
+    - warmup: The untimed runs of each phase
+    - repeats: The timed runs of each phase
+    - count: The number of random vectors of the simulate phase
+    - drawFormat: The format of the draw phase
+    Output:
+    - results: The timings of every phase of every design
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for path in paths:
+        for phase in selected:
+            task = (os.path.abspath(path), phase, warmup, max(1, repeats), count, drawFormat)
+            with context.Pool(1) as pool:
+                results.append(pool.apply(benchmarkPhase, (task,)))
+    return results
+
+
+def compareBaseline(results, baseline, threshold=regressionThreshold):
+    """
+    Compare the median times with the ones of a baseline run
+    Input:
+    - results: The timings of this run
+    - baseline: The timings of the baseline run
+    - threshold: The slowdown flagged as a regression
+    Output:
+    - returns the (design, phase) -> ratio of the median time to the baseline, and the
+        regressed (design, phase)
+    """
+    reference = {(r["design"], r["phase"]): r["median"] for r in baseline}
+    ratios = {}
+    regressions = []
+    for r in results:
+        key = (r["design"], r["phase"])
+        if reference.get(key, 0) > 0:
+            ratios[key] = r["median"] / reference[key]
+            if ratios[key] > 1 + threshold:
+                regressions.append(key)
+    return ratios, regressions
+
+
+def printTable(results, ratios):
+    """
+    Print the results as a table
+    Input:
+    - results: The timings of every phase of every design
+    - ratios: The (design, phase) -> ratio to the baseline
+    """
+    print(f"{'design':<10}{'phase':<11}{'median ms':>11}{'min ms':>10}{'peak MiB':>10}"
+          f"{'vec/s':>12}{'vs base':>9}")
+    for r in results:
+        rate = f"{r['vectorsPerSecond']:.0f}" if r["vectorsPerSecond"] is not None else "-"
+        ratio = ratios.get((r["design"], r["phase"]))
+        ratio = f"{ratio:.2f}x" if ratio is not None else "-"
+        print(f"{r['design']:<10}{r['phase']:<11}{r['median'] * 1e3:>11.2f}{r['min'] * 1e3:>10.2f}"
+              f"{r['peakRssKb'] / 1024:>10.1f}{rate:>12}{ratio:>9}")
+
+
+# Driver function of the benchmark
+if __name__ == "__main__":
+    args = parseArgs()
+    paths = sorted({path for pattern in args.designs for path in glob.glob(pattern)},
+                   key=os.path.getsize)
+    if len(paths) == 0:
+        sys.exit("No .vm files found.")
+    results = runBenchmark(paths, args.phases, args.warmup, args.repeats, args.vectors,
+                           args.draw_format)
+    ratios, regressions = {}, []
+    if args.baseline is not None:
+        with open(args.baseline) as fp:
+            ratios, regressions = compareBaseline(results, json.load(fp)["results"], args.threshold)
+    printTable(results, ratios)
+    if args.output is not None:
+        with open(args.output, "w") as fp:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "warmup": args.warmup,
+                "repeats": args.repeats,
+                "vectors": args.vectors,
+                "results": results
+            }, fp, indent=2)
+            fp.write("\n")
+    if len(regressions) > 0:
+        print(f"\nRegressions over {args.threshold:.0%}: " +
+              " ".join(f"{design}/{phase}" for design, phase in regressions))
+        sys.exit(1)
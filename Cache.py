@@ -0,0 +1,114 @@
+import hashlib
+import os
+import pickle
+
+# The cache is invalidated when the format of the cached data changes
+cacheVersion = 3
+defaultCacheDir = ".netlist_cache"
+# The cache directory is trimmed to this size, the least recently used entries first
+maxCacheBytes = 256 * 1024 * 1024
+
+
+def fileHash(filePath):
+    """
+    Hash the content of a file
+    Input:
+    - filePath: Path of the file
+    Output:
+    - returns the sha256 hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(filePath, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cachePath(cacheDir, filePath):
+    """
+    Get the path of the cache entry of a file, keyed by its absolute path
+    Input:
+    - cacheDir: The cache directory
+    - filePath: Path of the .vm file
+    Output:
+    - returns the path of the cache entry
+    """
+    key = hashlib.sha256(os.path.abspath(filePath).encode()).hexdigest()[:32]
+    return os.path.join(cacheDir, key + ".pkl")
+
+
+def loadCache(cacheDir, filePath):
+    """
+    Load the cached data of a file if it is still valid
+    The entry is valid if the mtime and size of the file are unchanged, or else if
+    the content hash is unchanged
+    Input:
+    - cacheDir: The cache directory
+    - filePath: Path of the .vm file
+    Output:
+    - returns the cached data, None if there is no valid entry
+    """
+    path = cachePath(cacheDir, filePath)
+    try:
+        with open(path, "rb") as fp:
+            header = pickle.load(fp)
+            stat = os.stat(filePath)
+            if header["version"] != cacheVersion:
+                return None
+            if (header["mtime"], header["size"]) != (stat.st_mtime_ns, stat.st_size) \
+                    and header["hash"] != fileHash(filePath):
+                return None
+            data = pickle.load(fp)
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+        return None
+    # Mark the entry as recently used
+    os.utime(path)
+    return data
+
+
+def saveCache(cacheDir, filePath, data, maxBytes=maxCacheBytes):
+    """
+    Save the data of a file to the cache and evict the old entries
+    Input:
+    - cacheDir: The cache directory
+    - filePath: Path of the .vm file
+    - data: The data to cache
+    - maxBytes: The size the cache directory is trimmed to
+    """
+    os.makedirs(cacheDir, exist_ok=True)
+    stat = os.stat(filePath)
+    header = {
+        "version": cacheVersion,
+        "path": os.path.abspath(filePath),
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": fileHash(filePath)
+    }
+    path = cachePath(cacheDir, filePath)
+    # Write to a temporary file first, so a reader never sees a partial entry
+    tmpPath = path + f".{os.getpid()}.tmp"
+    with open(tmpPath, "wb") as fp:
+        pickle.dump(header, fp, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, fp, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpPath, path)
+    evictCache(cacheDir, maxBytes)
+
+
+def evictCache(cacheDir, maxBytes=maxCacheBytes):
+    """
+    Remove the least recently used entries until the cache fits in maxBytes
+    Input:
+    - cacheDir: The cache directory
+    - maxBytes: The size the cache directory is trimmed to
+    """
+    entries = []
+    for name in os.listdir(cacheDir):
+        if name.endswith(".pkl"):
+            stat = os.stat(os.path.join(cacheDir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for mtime, size, name in entries)
+    for mtime, size, name in sorted(entries):
+        if total <= maxBytes:
+            break
+        os.remove(os.path.join(cacheDir, name))
+        total -= size
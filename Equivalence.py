@@ -0,0 +1,115 @@
+import random
+
+# Designs with up to this many inputs are checked on all of their vectors
+exhaustiveInputs = 24
+# The number of random vectors checked on the larger designs
+randomVectors = 1 << 22
+# The number of vectors packed in a word, log2
+batchBits = 16
+
+
+def countingWord(i, width):
+    """
+    Get the word of input i over a batch of consecutive vectors, lane k holds bit i of k
+    Input:
+    - i: The index of the input, i < log2(width)
+    - width: The number of vectors of the batch, a power of 2
+    Output:
+    - returns the packed word
+    """
+    period = 1 << (i + 1)
+    pattern = ((1 << (1 << i)) - 1) << (1 << i)
+    # Repeat the pattern over the whole word
+    return pattern * (((1 << width) - 1) // ((1 << period) - 1))
+
+
+def exhaustiveBatches(n, bits=batchBits):
+    """
+    Enumerate all the 2^n vectors as batches of packed words
+    The low inputs count inside a batch and the high inputs are constant within it
+    Input:
+    - n: The number of inputs
+    - bits: The number of vectors of a batch, log2
+    Output:
+    - yields the (input words, ones) of each batch
+    """
+    bits = min(bits, n)
+    width = 1 << bits
+    ones = (1 << width) - 1
+    low = [countingWord(i, width) for i in range(bits)]
+    for batch in range(1 << (n - bits)):
+        high = [ones if (batch >> j) & 1 else 0 for j in range(n - bits)]
+        yield low + high, ones
+
+
+def randomBatches(n, count, bits=batchBits, seed=None):
+    """
+    Generate random vectors as batches of packed words
+    Input:
+    - n: The number of inputs
+    - count: The number of vectors
+    - bits: The number of vectors of a batch, log2
+    - seed: The seed of the generator, for a reproducible check
+    Output:
+    - yields the (input words, ones) of each batch
+    """
+    rng = random.Random(seed)
+    for start in range(0, count, 1 << bits):
+        width = min(1 << bits, count - start)
+        yield [rng.getrandbits(width) for i in range(n)], (1 << width) - 1
+
+
+def checkEquivalence(reference, revised, inputs, outputs, exhaustive=None, count=randomVectors,
+                     seed=None):
+    """
+    Check that two netlists compute the same outputs, bit-parallel, stopping at the first mismatch
+    Input:
+    - reference: The Netlist of the original design
+    - revised: The Netlist of the modified design, with the same input and output names
+    - inputs: The names of the inputs, in the order of reference
+    - outputs: The names of the outputs, in the order of reference
+    - exhaustive: Check all the vectors if True, random vectors if False,
+        all the vectors up to exhaustiveInputs inputs if None
+    - count: The number of random vectors
+    - seed: The seed of the random vectors
+    Output:
+    - result: The mode, the number of checked vectors and the counterexample,
+        the counterexample is None if the netlists are equivalent
+    """
+    revisedInputs = [revised.netNames[net] for net in revised.inputIds]
+    revisedOutputs = [revised.netNames[net] for net in revised.outputIds]
+    if sorted(revisedInputs) != sorted(inputs) or sorted(revisedOutputs) != sorted(outputs):
+        raise ValueError("The netlists do not have the same inputs and outputs.")
+    # The position of each input and output of the revised netlist in the reference order
+    inputOrder = [inputs.index(name) for name in revisedInputs]
+    outputOrder = [revisedOutputs.index(name) for name in outputs]
+    if exhaustive is None:
+        exhaustive = len(inputs) <= exhaustiveInputs
+    if exhaustive:
+        batches = exhaustiveBatches(len(inputs))
+    else:
+        batches = randomBatches(len(inputs), count, seed=seed)
+    checked = 0
+    for words, ones in batches:
+        expected = reference.evaluateWords(words, ones)
+        actual = revised.evaluateWords([words[i] for i in inputOrder], ones)
+        expected = [expected[net] for net in reference.outputIds]
+        actual = [actual[revised.outputIds[i]] for i in outputOrder]
+        diff = 0
+        for e, a in zip(expected, actual):
+            diff |= e ^ a
+        if diff != 0:
+            # The first vector of the batch with a mismatch
+            lane = (diff & -diff).bit_length() - 1
+            return {
+                "mode": "exhaustive" if exhaustive else "random",
+                "vectors": checked + lane + 1,
+                "counterexample": {
+                    "inputs": {name: (w >> lane) & 1 for name, w in zip(inputs, words)},
+                    "expected": {name: (w >> lane) & 1 for name, w in zip(outputs, expected)},
+                    "actual": {name: (w >> lane) & 1 for name, w in zip(outputs, actual)}
+                }
+            }
+        checked += ones.bit_length()
+    return {"mode": "exhaustive" if exhaustive else "random", "vectors": checked,
+            "counterexample": None}
@@ -0,0 +1,193 @@
+import multiprocessing
+
+from ParallelSim import packWords, workerPool
+
+# Fault models
+# sa0  | The net is stuck at 0
+# sa1  | The net is stuck at 1
+# flip | The output of the cell driving the net is inverted
+faultModels = ("sa0", "sa1", "flip")
+
+# The netlist, the packed vectors and the golden values of a worker process, set by initWorker
+workerState = None
+
+
+def popcount(word):
+    """
+    Count the set bits of a packed word
+    Input:
+    - word: The packed word
+    Output:
+    - returns the number of set bits
+    """
+    return bin(word).count("1")
+
+
+def initWorker(netlist, batches):
+    """
+    Set up the state of a worker and simulate the golden run
+    Input:
+    - netlist: The Netlist under test
+    - batches: The packed vectors
+    """
+    global workerState
+    goldens = [netlist.evaluateWords(words, ones) for words, ones in batches]
+    workerState = (netlist, batches, goldens)
+
+
+def runFaults(groups):
+    """
+    Simulate a chunk of faults against the golden run of the worker
+    Input:
+    - groups: The list of (net, models) faults, grouped by net
+    Output:
+    - returns the list of (net, model, activated, observed) of each fault
+    """
+    netlist, batches, goldens = workerState
+    outputIds = netlist.outputIds
+    evaluateCellWords = netlist.evaluateCellWords
+    results = []
+    for net, models in groups:
+        cone = None
+        for model in models:
+            activated = 0
+            observed = 0
+            for (words, ones), golden in zip(batches, goldens):
+                if model == "sa0":
+                    value = 0
+                elif model == "sa1":
+                    value = ones
+                else:
+                    value = golden[net] ^ ones
+                # The vectors where the fault changes the value of the net
+                excited = value ^ golden[net]
+                if excited == 0:
+                    continue
+                activated += popcount(excited)
+                # Only the cells in the fanout cone of the net are re-evaluated
+                if cone is None:
+                    cone = netlist.forwardCone(net)
+                faulty = list(golden)
+                faulty[net] = value
+                for c in cone:
+                    evaluateCellWords(c, faulty, ones)
+                lanes = 0
+                for o in outputIds:
+                    lanes |= faulty[o] ^ golden[o]
+                observed += popcount(lanes)
+            results.append((net, model, activated, observed))
+    return results
+
+
+class FaultCampaign:
+    """
+    A class for the stuck-at and bit-flip fault injection campaign of a netlist
+
+    Every fault is simulated bit-parallel against the vector set and the outputs
+    are compared with the golden run. A fault is detected if some vector shows it
+    at a primary output, and it is masked for a vector if it changes its net but
+    none of the outputs
+
+    Attributes:
+    - netlist: The Netlist under test
+    - vectors: The vectors as strings of 0 / 1
+    - models: The fault models to inject
+    - batchSize: The number of vectors packed in a word
+
+    Functions:
+    - Private:
+        - __init__
+    - Public:
+        - faults
+        - run
+    """
+
+    def __init__(self, netlist, vectors, models=faultModels, batchSize=4096):
+        """
+        Input:
+        - netlist: The Netlist under test
+        - vectors: The vectors as strings of 0 / 1
+        - models: The fault models to inject
+        - batchSize: The number of vectors packed in a word
+        """
+        for model in models:
+            if model not in faultModels:
+                raise ValueError(f"Unknown fault model {model}.")
+        self.netlist = netlist
+        self.vectors = vectors
+        self.models = models
+        self.batchSize = batchSize
+
+    def faults(self):
+        """
+        A function that enumerates the faults of the netlist, grouped by net
+        The stuck-at faults are injected on the primary inputs and on every driven net,
+        the bit-flips on every cell output
+        Output:
+        - groups: The list of (net, models)
+        """
+        groups = []
+        nets = set(self.netlist.inputIds)
+        netIds = self.netlist.netIds
+        for net, name in enumerate(self.netlist.netNames):
+            # The dangling nets of unconnected outputs are not in netIds and have no faults
+            if netIds.get(name) != net:
+                continue
+            if net in nets or self.netlist.drivers[net] != -1:
+                models = [m for m in self.models
+                          if m != "flip" or self.netlist.drivers[net] != -1]
+                if len(models) > 0:
+                    groups.append((net, models))
+        return groups
+
+    def run(self, workers=None, chunkSize=64):
+        """
+        A function that runs the campaign, split across a process pool
+        Input:
+        - workers: The number of processes, all the cores if None, in-process if 1
+        - chunkSize: The number of nets simulated per task
+        Output:
+        - report: The fault coverage and masking rate of the campaign
+        """
+        batches = [packWords(self.vectors[start:start + self.batchSize])
+                   for start in range(0, len(self.vectors), self.batchSize)]
+        groups = self.faults()
+        chunks = [groups[i:i + chunkSize] for i in range(0, len(groups), chunkSize)]
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        results = []
+        if workers == 1 or len(chunks) <= 1:
+            initWorker(self.netlist, batches)
+            for chunk in chunks:
+                results.extend(runFaults(chunk))
+        else:
+            # With fork the workers inherit the netlist and the golden run without copying them
+            with workerPool(workers, initWorker, (self.netlist, batches)) as pool:
+                for result in pool.imap_unordered(runFaults, chunks):
+                    results.extend(result)
+        return self.__report(results)
+
+    def __report(self, results):
+        """
+        A function that summarizes the simulated faults
+        Input:
+        - results: The list of (net, model, activated, observed) of each fault
+        Output:
+        - report: The fault coverage and masking rate of the campaign
+        """
+        netNames = self.netlist.netNames
+        detected = [r for r in results if r[3] > 0]
+        activated = sum(r[2] for r in results)
+        observed = sum(r[3] for r in results)
+        return {
+            "vectors": len(self.vectors),
+            "cells": len(self.netlist.cellNames),
+            "faults": len(results),
+            "detected": len(detected),
+            "coverage": len(detected) / len(results) if len(results) > 0 else 0.0,
+            "activated": activated,
+            "observed": observed,
+            "maskingRate": 1 - observed / activated if activated > 0 else 0.0,
+            "undetected": sorted(f"{netNames[net]}/{model}"
+                                 for net, model, a, o in results if o == 0)
+        }
@@ -1,44 +1,115 @@
 import os
+import re
+import sys
+from collections import Counter
+from contextlib import nullcontext
 
 import networkx as nx
-from matplotlib import pyplot as plt
 
+from Cache import loadCache, saveCache
+from Equivalence import checkEquivalence, randomVectors
+from FaultCampaign import FaultCampaign, faultModels
+from Netlist import Netlist, typeNames
+from ParallelSim import Progress, simulateSharded, simulateWords
+from Stimulus import ResponseWriter, readStimulus
+from Timing import TimingReport
+from TMR import and2Init, or3Init, triplicate
 
-def getG(inp, f0, f1):
+
+def decodeInit(value):
     """
-    Get the output G in the ARI block which is determined by the init[16] and init[17]
+    Decode the INIT value of a defparam to its truth table
     Input:
-    - inp: INIT[16:17]
-    - f0: Output when A = 0
-    - f1: Output when A = 1
+    - value: The INIT value, e.g. 16'hFC70
     Output:
-    - returns G
+    - returns the truth table as an integer, bit i is the output for index i
     """
-    if inp == "00":
-        return 0
-    elif inp == "01":
-        return f0
-    elif inp == "10":
-        return 1
-    elif inp == "11":
-        return f1
+    width, number = value.split("'")
+    return int(number[1:], 16) & ((1 << int(width)) - 1)
 
 
-def getP(inp, y):
+def vectorBits(vector, length):
     """
-    Get the output P in the ARI block which is determined by the init[18] and init[19]
+    Convert an input vector to a string of 0 / 1
     Input:
-    - inp: INIT[18:19]
-    - y: output Y of the ARI block
+    - vector: A string of 0 / 1 or a sequence of bits
+    - length: The number of primary inputs
     Output:
-    - returns P
+    - returns the vector as a string of 0 / 1
     """
-    if inp == "00":
-        return 0
-    elif inp == "01":
-        return y
+    if isinstance(vector, str):
+        bits = vector.replace(",", "").replace(" ", "").strip()
     else:
-        return 1
+        bits = "".join(str(int(b)) for b in vector)
+    if len(bits) != length or bits.strip("01") != "":
+        raise ValueError(f"Vector {vector!r} is not a {length} bit vector.")
+    return bits
+
+
+def valueBits(values, inputs):
+    """
+    Convert a single vector given as input -> value to a list of bits
+    Input:
+    - values: The input -> value (0 / 1) of the vector
+    - inputs: The inputs to read, in order
+    Output:
+    - returns the value of each input as 0 / 1
+    """
+    bits = []
+    for i in inputs:
+        if i not in values:
+            raise ValueError(f"Input {i} has no value.")
+        value = values[i].strip() if isinstance(values[i], str) else values[i]
+        if value not in (0, 1, "0", "1"):
+            raise ValueError(f"Input {i} has the value {values[i]!r}, not 0 / 1.")
+        bits.append(int(value))
+    return bits
+
+
+# Output ports of the modules and the color of the edges they drive
+# Color Map
+# Black |  Y / PAD of the CFG1 / CG2 / CFG3 / CFG4 / INBUF / OUTBUF / TRIBUFF modules
+# Red   |  Y of the ARI1 module
+# Blue  |  S of the ARI1 module
+# Green |  FCO of the ARI1 module
+moduleOutputs = {"Y": 'black'}
+moduleTypes = ("INBUF", "OUTBUF", "TRIBUFF", "CFG1", "CFG2", "CFG3", "CFG4")
+bufferOutputs = {"OUTBUF": "PAD", "TRIBUFF": "PAD"}
+ari1Outputs = {"Y": 'red', "S": 'blue', "FCO": 'green'}
+ari1Ports = {color: port for port, color in ari1Outputs.items()}
+
+# The defparams of the TMR voters
+tmrInits = {"and": f"4'h{and2Init:X}", "or": f"8'h{or3Init:X}"}
+
+# Column, color and size of each kind of module in the drawing
+cellLayout = {
+    "INBUF": (10, 'red', 20000),
+    "ARI1": (20, 'orange', 60000),
+    "CFG": (30, 'orange', 60000),
+    "OUTBUF": (40, 'yellow', 20000),
+    "TRIBUFF": (40, 'yellow', 20000)
+}
+
+# The parsed and levelized data saved in the netlist cache
+cachedAttributes = ("dataTypes", "modules", "defparam", "ari1", "drivers", "fanouts",
+                    "multiDriven", "undriven", "cellTypes", "ports", "truthTables", "netlist")
+
+# Grammar of the netlist
+# Instance:    CFG4 name (     or     ARI1 \\escaped[0]  (
+# Port:        .A(net),
+# Defparam:    defparam name.INIT=16'hFC70;
+# Declaration: input N1 ;     or     wire [0:0] un1_G1008_3_Z;
+instancePattern = re.compile(r"^\s*(\w+)\s+(\\\S+|\w+)\s*\(\s*$")
+portPattern = re.compile(r"^\s*\.(\w+)\s*\(\s*(.*?)\s*\)")
+defparamPattern = re.compile(r"^\s*defparam\s+(\\\S+|[^\s.]+)\s*\.INIT\s*=\s*(\d+'[hH][0-9A-Fa-f]+)")
+declarationPattern = re.compile(r"^\s*(input|output|wire)\s+(?:\[[^\]]*\]\s*)?(\S+?)\s*;")
+
+# Drawing scale
+# The node sizes are given for nodeUnitInches per unit of the layout
+# The canvas is drawn at inchesPerUnit and a raster image is capped at rasterInches
+nodeUnitInches = 1.5
+inchesPerUnit = 0.5
+rasterInches = 80
 
 
 class Graph:
@@ -48,56 +119,159 @@ class Graph:
     Attributes: 
     - filePath: Path of the input .vm file
     - graph: MultiDiGraph from the networkx module which supports multiple edges between two nodes 
-        and it is a directed graph
+        and it is a directed graph, it is only built when it is used (drawing and TMR)
     - dataType: The input, output and wire instances
     - modules: The INBUF, OUTBUF, TRIBUFF, CFG1, CFG2, CFG3, CFG4 modules with inputs and outputs
     - defparams: The defparams data
     - ari1: The ARI1 modules with inputs and outputs
+    - drivers: The net -> (module, color) index of the module output driving each net
+    - fanouts: The net -> [modules] index of the modules reading each net
+    - undriven: The nets that are read by some module but driven by none
+    - multiDriven: The net -> [modules] of the nets driven by more than one module
+    - cellTypes: The module -> cell type (INBUF, CFG4, ARI1, ...) of every instance
+    - ports: The module -> {port: net} connections of every instance
+    - truthTables: The module -> truth table decoded from the defparams
+    - netlist: The compact array-backed Netlist used for the simulation
+    - baseNetlist: The Netlist before the first applyTMR, None if nothing is triplicated
+    - cacheDir: The directory of the parsed netlist cache, no caching if None
+    - tmrRoles: The module -> role (copy, and, or) of the modules added by applyTMR
+    - cones: The outputs -> (Netlist, input positions) of the cone of influence of the outputs
+    - stats: The Stats object the timers and counters are recorded into, none if None
+    - verbose: Print the progress, the adjacency list and the results
 
     Functions:
     - Private:
         - __init__
         - __parse
+        - __addInstance
+        - __timer
+        - __countSweeps
+        - __batches
+        - __simulateWords
+        - __outputColors
+        - __indexCell
+        - __unindexCell
+        - __addDriver
+        - __undrivenNets
         - __findNode
+        - __reportNets
         - __drawGraph
+        - __render
+        - __writeDot
+        - __writeGraphml
+        - __buildGraph
+        - __compactLayout
     - Public:
+        - fromFile
         - construct
+        - coneOfLogic
+        - coneNetlist
+        - simulateCone
+        - draw
         - simulate
+        - simulateBatch
+        - simulateStream
+        - simulateParallel
+        - simulateIncremental
+        - faultCampaign
+        - checkEquivalence
+        - timingReport
+        - applyTMR
         - TMRApproach
     """
 
-    def __init__(self):
-        self.filePath = input(
-            '\x1b[0;36;49m' + "Enter the path for the .vm file: " + '\x1b[0m')
-        self.graph = nx.MultiDiGraph()
+    def __init__(self, filePath=None, verbose=True, cacheDir=None, stats=None):
+        """
+        Input:
+        - filePath: Path of the input .vm file, prompted for if it is not given
+        - verbose: Print the progress, the adjacency list and the results
+        - cacheDir: The directory of the parsed netlist cache, no caching if None
+        - stats: The Stats object the timers and counters are recorded into, none if None
+        """
+        if filePath is None:
+            filePath = input(
+                '\x1b[0;36;49m' + "Enter the path for the .vm file: " + '\x1b[0m')
+        self.filePath = filePath
+        self.verbose = verbose
+        self.__graph = None
+        self.drivers = {}
+        self.fanouts = {}
+        self.multiDriven = {}
+        self.cellTypes = {}
+        self.ports = {}
+        self.truthTables = {}
+        self.netlist = None
+        self.baseNetlist = None
+        self.tmrRoles = {}
+        self.cones = {}
+        self.cacheDir = cacheDir
+        self.stats = stats
+        # Load the parsed and levelized netlist from the cache
+        cached = None
+        if cacheDir is not None:
+            with self.__timer("cacheLoad"):
+                cached = loadCache(cacheDir, filePath)
+        if cached is not None:
+            for key in cachedAttributes:
+                setattr(self, key, cached[key])
+            if stats is not None:
+                stats.count("cacheHits")
+            return
         # Parse the given file and get the data
-        self.dataTypes, self.modules, self.defparam, self.ari1 = self.__parse()
+        with self.__timer("parse"):
+            self.dataTypes, self.modules, self.defparam, self.ari1 = self.__parse()
+            self.undriven = self.__undrivenNets()
+
+    @classmethod
+    def fromFile(cls, filePath, verbose=False, cacheDir=None, stats=None):
+        """
+        A function that parses a .vm file without any prompts
+        Input:
+        - filePath: Path of the input .vm file
+        - verbose: Print the progress, the adjacency list and the results
+        - cacheDir: The directory of the parsed netlist cache, no caching if None
+        - stats: The Stats object the timers and counters are recorded into, none if None
+        Output:
+        - returns the Graph of the file
+        """
+        return cls(filePath, verbose, cacheDir, stats)
+
+    def __timer(self, name):
+        """
+        A function that times a phase into the stats
+        Input:
+        - name: The name of the phase
+        Output:
+        - returns the timer context, a no-op context if there are no stats
+        """
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.timer(name)
+
+    def __countSweeps(self, sweeps, netlist=None):
+        """
+        A function that counts the cell evaluations of full sweeps over the netlist
+        Input:
+        - sweeps: The number of times every cell was evaluated
+        - netlist: The swept Netlist, e.g. a cone, the netlist of the graph if None
+        """
+        if netlist is None:
+            netlist = self.netlist
+        for t, n in Counter(netlist.types).items():
+            self.stats.countCells(typeNames[t], n * sweeps)
 
     def __parse(self):
         """
         A function to parse the input vm file
+        The file is streamed line by line and each line is matched against the
+        compiled grammar, so the memory does not grow with the size of the file
         Output:
         - dataType: The input, output and wire instances
         - modules: The INBUF, OUTBUF, TRIBUFF, CFG1, CFG2, CFG3, CFG4 modules with inputs and outputs
         - defparams: The defparams data
         - ari1: The ARI1 modules with inputs and outputs
+        The drivers and fanouts indices are filled in the same pass
         """
-        with open(self.filePath, "r") as fp:
-            fileData = fp.readlines()
-        flag = 0
-        name = ""
-        mod = ""
-        flags = {
-            "INBUF": 0,
-            "OUTBUF": 0,
-            "CFG1": 0,
-            "CFG2": 0,
-            "CFG3": 0,
-            "CFG4": 0,
-            "TRIBUFF": 0,
-            "": 0
-        }
-        ariFlag = 0
         ari1 = {}
         defparam = {}
         dataTypes = {
@@ -106,80 +280,143 @@ class Graph:
             "wire": []
         }
         modules = {}
-        # Loop through each line of the file
-        for line in fileData:
-            # Split the lines to words
-            words = line.split()
-            # Edge cases
-            if len(words) == 0:
-                continue
-            if words[0] == "//" or words[0] == "`timescale" or words[0] == "endmodule":
-                continue
-            if words[0] == "module":
-                flag = 1
-                continue
-            if flag == 1:
-                if words[0] == ";":
-                    flag = 0
-                continue
-            # If the first word is a datatype i.e., input/output/wire
-            if words[0] in list(dataTypes.keys()):
-                dataTypes[words[0]].append(words[1])
-            # If it is CFG1 / CG2 / CFG3 / CFG4 / INBUF / OUTBUF / TRIBUFF module
-            if words[0] in flags.keys():
-                # Copy the instantiation name and set the corresponding flag to 1
-                mod = words[0]
-                name = words[1]
-                modules[name] = []
-                flags[mod] = 1
-                continue
-            # If the flag is 1
-            if flags[mod] == 1:
-                # End of the module
-                if words[0] == ");":
-                    flags[mod] = 0
+        # The instance being read and its (port, net) connections
+        mod = None
+        name = None
+        connections = []
+        lines = 0
+        with open(self.filePath, "r") as fp:
+            # Loop through each line of the file
+            for lines, line in enumerate(fp, 1):
+                # Port of the current instance
+                if mod is not None:
+                    match = portPattern.match(line)
+                    if match is not None:
+                        connections.append(match.groups())
+                    elif line.lstrip()[:1] in (")", ";"):
+                        # End of the module or of the port list of the top module
+                        if mod in moduleTypes or mod == "ARI1":
+                            self.__addInstance(mod, name, connections, modules, ari1)
+                        mod = None
                     continue
-                # Ports to the module
-                else:
-                    # Append the data within the paranthesis, if it is an input
-                    # Insert it at index 0, if it is an output
-                    x = words[0].find("(")
-                    y = words[0].find(")")
-                    if words[0][1] == "Y":
-                        modules[name].insert(0, words[0][x + 1:y])
-                    else:
-                        modules[name].append(words[0][x+1:y])
-            # If it is an ARI1 module
-            if words[0] == "ARI1":
-                # Copy the instantiation name and set the flag to 1
-                name = words[1]
-                ari1[name] = []
-                ariFlag = 1
-                continue
-            if ariFlag == 1:
-                # End of the module
-                if words[0] == ");":
-                    ariFlag = 0
+                # Instantiation of a module
+                match = instancePattern.match(line)
+                if match is not None:
+                    mod, name = match.groups()
+                    connections = []
                     continue
-                else:
-                    # Append the data within the paranthesis, if it is an input
-                    # Insert it at index 0, if it is an output
-                    x = words[0].find("(")
-                    y = words[0].find(")")
-                    ari1[name].append(words[0][x+1:y])
-            # If it is a defparam
-            if words[0] == "defparam":
-                try:
-                    words[1] = words[1] + words[2]
-                except:
-                    pass
-                # Split the word to get the hexadecimal value
-                x = words[1].replace("=", "= ")
-                x = x.replace(";", " ;").split()
-                defparam[name] = x[1]
+                # If it is a defparam
+                match = defparamPattern.match(line)
+                if match is not None:
+                    name, value = match.groups()
+                    defparam[name] = value
+                    # Decode the truth table once, the ARI1 carry selectors are split from the LUT
+                    # CFG: init[15:0]
+                    # ARI1: init[15:0], init[17:16], init[19:18]
+                    init = decodeInit(value)
+                    if name in ari1:
+                        init = (init & 0xFFFF, (init >> 16) & 3, (init >> 18) & 3)
+                    self.truthTables[name] = init
+                    continue
+                # If the first word is a datatype i.e., input/output/wire
+                match = declarationPattern.match(line)
+                if match is not None:
+                    dataTypes[match.group(1)].append(match.group(2))
+        if self.stats is not None:
+            self.stats.count("parseLines", lines)
+            self.stats.count("parseBytes", os.path.getsize(self.filePath))
         # Return the data
         return dataTypes, modules, defparam, ari1
 
+    def __addInstance(self, mod, name, connections, modules, ari1):
+        """
+        A function that records a parsed instance and indexes its nets
+        Input:
+        - mod: The type of the module
+        - name: The instantiation name
+        - connections: The (port, net) connections in the order of the file
+        - modules: The CFG1 / CG2 / CFG3 / CFG4 / INBUF / OUTBUF / TRIBUFF modules
+        - ari1: The ARI1 modules
+        """
+        self.cellTypes[name] = mod
+        self.ports[name] = dict(connections)
+        if mod == "ARI1":
+            # The nets in the order of the file
+            ari1[name] = [net for port, net in connections]
+        else:
+            # The output at index 0 followed by the inputs in the order of the file
+            output = bufferOutputs.get(mod, "Y")
+            modules[name] = [net for port, net in connections if port == output]
+            modules[name] += [net for port, net in connections if port != output]
+        self.__indexCell(name)
+
+    def __outputColors(self, name):
+        """
+        A function that gives the output ports of a module and the color of their edges
+        Input:
+        - name: The module
+        Output:
+        - returns the port -> color of the outputs
+        """
+        mod = self.cellTypes[name]
+        if mod == "ARI1":
+            return ari1Outputs
+        return {bufferOutputs.get(mod, "Y"): moduleOutputs["Y"]}
+
+    def __indexCell(self, name):
+        """
+        A function that adds the nets of a module to the drivers and fanouts indices
+        Input:
+        - name: The module
+        """
+        colors = self.__outputColors(name)
+        for port, net in self.ports[name].items():
+            if port in colors:
+                self.__addDriver(net, name, colors[port])
+            else:
+                self.fanouts.setdefault(net, []).append(name)
+
+    def __unindexCell(self, name):
+        """
+        A function that removes the nets of a module from the drivers and fanouts indices
+        Input:
+        - name: The module
+        """
+        colors = self.__outputColors(name)
+        for port, net in self.ports[name].items():
+            if port in colors:
+                if self.drivers.get(net, (None,))[0] == name:
+                    del self.drivers[net]
+            elif name in self.fanouts.get(net, []):
+                self.fanouts[net].remove(name)
+
+    def __addDriver(self, net, name, color):
+        """
+        A function that records the module output driving a net
+        Input:
+        - net: The net connected to the output port
+        - name: The module driving the net
+        - color: The color of the output port
+        """
+        # The first driver is kept, the others are reported
+        if net in self.drivers:
+            if net not in self.multiDriven:
+                self.multiDriven[net] = [self.drivers[net][0]]
+            self.multiDriven[net].append(name)
+        else:
+            self.drivers[net] = (name, color)
+
+    def __undrivenNets(self):
+        """
+        A function that finds the nets which are read but never driven
+        Output:
+        - undriven: The list of undriven nets
+        """
+        known = set(self.dataTypes["input"])
+        known.update(("GND", "VCC"))
+        return [net for net in self.fanouts
+                if net not in self.drivers and net not in known]
+
     def __findNode(self, current):
         """
         A function that finds the node where the output is generated
@@ -190,333 +427,715 @@ class Graph:
         - color: The color to differentiate the output wires of ARI1 block
             Color Map
             Red   |  Y
-            Blue  |  D
+            Blue  |  S
             Green |  FCO 
+        Returns None if the net is undriven
+        """
+        if self.stats is not None:
+            self.stats.count("findNodeLookups")
+        # Lookup in the net -> driver index built by the parser
+        return self.drivers.get(current)
+
+    def __reportNets(self):
+        """
+        A function that reports the undriven and multiply-driven nets of the netlist
         """
-        # Looping through the CFG1 / CG2 / CFG3 / CFG4 / INBUF / OUTBUF / TRIBUFF modules
-        # Output for these modules is at index 0
-        for i, j in self.modules.items():
-            # Compare it to the current name
-            if current == j[0]:
-                return i, 'black'
-        # Looping through the ARI1 modules
-        # Output for the module is at index 0, 1, 2
-        for i, j in self.ari1.items():
-            # Compare it to the current name
-            # Red: Y, Blue: S, Green: FCO
-            if current == j[0]:
-                return i, 'red'
-            elif current == j[1]:
-                return i, 'blue'
-            elif current == j[2]:
-                return i, 'green'
-
-    def __drawGraph(self, fileName):
-        """
-        A function to draw the graph on the canvas
+        if not self.verbose:
+            return
+        for net in self.undriven:
+            print('\x1b[0;31;49m' + f"Warning: net {net} is undriven" + '\x1b[0m')
+        for net, drivers in self.multiDriven.items():
+            print('\x1b[0;31;49m' + f"Warning: net {net} is driven by " +
+                  ", ".join(drivers) + '\x1b[0m')
+
+    def __drawGraph(self, fileName, fmt="png", nodes=None):
+        """
+        A function to draw the graph on the canvas or export it
         Input
         - fileName: Output file name
+        - fmt: png / svg are rendered with matplotlib, dot / graphml are written as text
+        - nodes: Only draw the cone of logic of these nodes, the whole graph if None
+        Output:
+        - outputPath: The path of the written file
+        """
+        graph = self.graph
+        if nodes is not None:
+            graph = self.__compactLayout(self.graph.subgraph(self.coneOfLogic(nodes)))
+            fileName += "_cone"
+        os.makedirs("Output", exist_ok=True)
+        outputPath = 'Output/' + fileName + '.' + fmt
+
+        if self.verbose:
+            print('\x1b[0;31;49m' + "\nConstructing the graph...\n" + '\x1b[0m')
+
+        with self.__timer("draw"):
+            if fmt == "dot":
+                self.__writeDot(graph, outputPath)
+            elif fmt == "graphml":
+                self.__writeGraphml(graph, outputPath)
+            elif fmt in ("png", "svg"):
+                self.__render(graph, outputPath)
+            else:
+                raise ValueError(f"Unknown drawing format {fmt}.")
+        if self.stats is not None:
+            self.stats.count("bytesRendered", os.path.getsize(outputPath))
+        if self.verbose:
+            print('\x1b[1;32;49m' + "The graph as a adjacency list:" + '\x1b[0m')
+            for x, y in nx.to_dict_of_lists(graph).items():
+                print('\x1b[0;34;49m' + x + '\x1b[0m', end=": ")
+                print(y)
+            print('\x1b[0;33;49m' +
+                  f"\nThe graph is stored as an image at {outputPath}." + '\x1b[0m')
+        return outputPath
+
+    def __render(self, graph, outputPath):
+        """
+        A function to render the graph with matplotlib
+        The canvas is sized from the layout instead of a fixed 100 x 200 inch figure,
+        raster images are capped at rasterInches and the nodes are scaled to fit
+        Input
+        - graph: The graph or sub-graph to render
+        - outputPath: The path of the .png / .svg file
         """
+        # matplotlib is only needed for rendering, so it is imported here
+        from matplotlib import pyplot as plt
         # Get the attributes of the graph and plot it
-        pos = nx.get_node_attributes(self.graph, 'pos')
-        color = list(nx.get_node_attributes(self.graph, 'color').values())
-        size = list(nx.get_node_attributes(self.graph, 'size').values())
-        graphDict = nx.to_dict_of_lists(self.graph)
-
-        print('\x1b[0;31;49m' + "\nConstructing the graph...\n" + '\x1b[0m')
-
-        nx.draw(self.graph, pos, node_color=color,
-                with_labels=True, font_size=24, node_size=size)
-        outputPath = 'Output/' + fileName + '.png'
-        plt.savefig(outputPath)
-        print('\x1b[1;32;49m' + "The graph as a adjacency list:" + '\x1b[0m')
-        for x, y in graphDict.items():
-            print('\x1b[0;34;49m' + x + '\x1b[0m', end=": ")
-            print(y)
-        print('\x1b[0;33;49m' +
-              f"\nThe graph is stored as an image at {outputPath}." + '\x1b[0m')
-
-    def construct(self):
+        pos = nx.get_node_attributes(graph, 'pos')
+        color = list(nx.get_node_attributes(graph, 'color').values())
+        size = list(nx.get_node_attributes(graph, 'size').values())
+        xs = [x for x, y in pos.values()]
+        ys = [y for x, y in pos.values()]
+        width = (max(xs) - min(xs) + 10) * inchesPerUnit
+        height = (max(ys) - min(ys) + 10) * inchesPerUnit
+        scale = 1
+        if outputPath.endswith(".png"):
+            scale = min(1, rasterInches / max(width, height))
+        fig = plt.figure(figsize=(width * scale, height * scale))
+        # The sizes of the nodes are given for a canvas of nodeUnitInches per unit
+        factor = (inchesPerUnit * scale / nodeUnitInches) ** 2
+        nx.draw(graph, pos, node_color=color, with_labels=True,
+                font_size=24 * inchesPerUnit * scale / nodeUnitInches,
+                node_size=[i * factor for i in size])
+        fig.savefig(outputPath)
+        plt.close(fig)
+
+    def __writeDot(self, graph, outputPath):
         """
-        A function that constructs and draws the graph from the parsed vm file
+        A function to write the graph in the DOT format, line by line
+        Input
+        - graph: The graph or sub-graph to write
+        - outputPath: The path of the .dot file
+        """
+        with open(outputPath, "w") as fp:
+            fp.write('digraph "' + os.path.basename(outputPath) + '" {\n')
+            for node, data in graph.nodes(data=True):
+                x, y = data.get("pos", (0, 0))
+                fp.write(f'  "{node}" [color="{data.get("color", "black")}", '
+                         f'pos="{x},{y}!"];\n')
+            for src, dest, data in graph.edges(data=True):
+                label = data.get("weight")
+                fp.write(f'  "{src}" -> "{dest}" [color="{data.get("color", "black")}"' +
+                         ("" if label is None else f', label="{label}"') + '];\n')
+            fp.write("}\n")
+
+    def __writeGraphml(self, graph, outputPath):
+        """
+        A function to write the graph in the GraphML format
+        Input
+        - graph: The graph or sub-graph to write
+        - outputPath: The path of the .graphml file
+        """
+        # GraphML only supports scalar attributes, so the position is split
+        export = nx.MultiDiGraph()
+        for node, data in graph.nodes(data=True):
+            x, y = data.get("pos", (0, 0))
+            export.add_node(node, color=data.get("color", "black"), x=x, y=y)
+        for src, dest, data in graph.edges(data=True):
+            export.add_edge(src, dest, **{k: str(v) for k, v in data.items() if v is not None})
+        nx.write_graphml(export, outputPath)
+
+    def coneOfLogic(self, nodes):
+        """
+        A function that finds the cone of logic of the given nodes
+        The cone of the outputs is taken from the cached coneNetlist, the cone of the
+        other nodes is searched in the graph
+        Input:
+        - nodes: The nodes (modules, inputs or outputs) of interest
+        Output:
+        - cone: The nodes and all the nodes in their transitive fanin
+        """
+        outputs = [node for node in nodes if node in self.dataTypes["output"]]
+        cone = set(outputs)
+        if len(outputs) > 0:
+            netlist = self.coneNetlist(outputs)[0]
+            cone.update(netlist.cellNames)
+            cone.update(netlist.netNames[net] for net in netlist.inputIds)
+            cone.update(netlist.netNames[net] for net in (0, 1) if net in netlist.faninNets)
+        for node in nodes:
+            if node not in self.graph:
+                raise ValueError(f"Node {node} not in the graph.")
+            if node not in cone:
+                cone.add(node)
+                cone.update(nx.ancestors(self.graph, node))
+        return cone
+
+    def coneNetlist(self, outputs):
         """
-        plt.figure(figsize=(100, 200))
-        moduleKeys = list(self.modules.keys())
-        ibuf, obuf, cfg = 0, 0, 0
-        # Add the input data types to the graph
-        for i in range(len(self.dataTypes["input"])):
-            self.graph.add_node(
-                self.dataTypes["input"][i], pos=(0, -10*i), color='blue', size=5000)
-        # Add the output data types to the graph
-        for i in range(len(self.dataTypes["output"])):
-            self.graph.add_node(
-                self.dataTypes["output"][i], pos=(50, -10*i), color='green', size=5000)
-        for i in range(len(moduleKeys)):
-            # Add the INBUF modules to the graph
-            if moduleKeys[i].endswith("ibuf"):
-                self.graph.add_node(moduleKeys[i], pos=(
-                    10, -10*ibuf), color='red', size=20000)
-                ibuf += 1
-            # Add the OUTBUF modules to the graph
-            elif moduleKeys[i].endswith("obuf"):
-                self.graph.add_node(moduleKeys[i], pos=(
-                    40, -10*obuf), color='yellow', size=20000)
-                obuf += 1
-            # Add the TRIBUFF / CFG1 / CFG2 / CFG3 / CFG4 modules to the graph
+        A function that extracts the cone of influence of some outputs as its own netlist
+        Only the cells in the transitive fanin of the outputs and the inputs they read
+        are kept. The cone is cached until the netlist changes
+        Input:
+        - outputs: The outputs of interest
+        Output:
+        - returns the Netlist of the cone, with the outputs in the given order, and the
+            positions in the vectors of the inputs of the cone
+        """
+        key = tuple(outputs)
+        if key not in self.cones:
+            for i in outputs:
+                if i not in self.dataTypes["output"]:
+                    raise ValueError(f"Output {i} not in the file.")
+            netlist = self.netlist
+            cone = netlist.faninCone([netlist.netIds[i] for i in outputs])
+            cells = [netlist.cellNames[c] for c in cone]
+            nets = {net for c in cone
+                    for net in netlist.faninNets[netlist.faninStart[c]:netlist.faninStart[c + 1]]}
+            nets.update(netlist.netIds[i] for i in outputs)
+            columns = [k for k, net in enumerate(netlist.inputIds) if net in nets]
+            coneNetlist = Netlist([self.dataTypes["input"][k] for k in columns], list(outputs),
+                                  {name: self.cellTypes[name] for name in cells},
+                                  {name: self.ports[name] for name in cells},
+                                  {name: self.truthTables[name] for name in cells
+                                   if name in self.truthTables})
+            self.cones[key] = (coneNetlist, columns)
+            if self.stats is not None:
+                self.stats.count("coneCells", len(cells))
+        return self.cones[key]
+
+    def simulateCone(self, outputs, vectors, batchSize=4096):
+        """
+        A function that simulates only the cone of influence of some outputs
+        Input:
+        - outputs: The outputs of interest
+        - vectors: A single vector as input -> value, or the vectors as for simulateBatch
+        - batchSize: The number of vectors packed in a word
+        Output:
+        - out: The output -> value for a single vector, else the output matrix with one
+            row of bits per vector in the order of outputs
+        """
+        netlist, columns = self.coneNetlist(outputs)
+        if isinstance(vectors, dict):
+            inputs = self.dataTypes["input"]
+            with self.__timer("simulateCone"):
+                values = netlist.evaluate(valueBits(vectors, [inputs[k] for k in columns]))
+            if self.stats is not None:
+                self.stats.count("vectors")
+                self.stats.count("sweeps")
+                self.__countSweeps(1, netlist)
+            return {i: values[net] for i, net in zip(outputs, netlist.outputIds)}
+        if isinstance(vectors, str):
+            vectors = readStimulus(vectors)
+        out = []
+        sweeps = 0
+        with self.__timer("simulateCone"):
+            for batch in self.__batches(vectors, batchSize):
+                out.extend(simulateWords(netlist, batch, columns))
+                sweeps += 1
+        if self.stats is not None:
+            self.stats.count("vectors", len(out))
+            self.stats.count("sweeps", sweeps)
+            self.__countSweeps(sweeps, netlist)
+        return out
+
+    def draw(self, fmt="png", nodes=None, fileName=None):
+        """
+        A function to draw the graph or the cone of logic of some nodes
+        Input:
+        - fmt: png / svg / dot / graphml
+        - nodes: Only draw the cone of logic of these nodes, the whole graph if None
+        - fileName: Output file name, the name of the .vm file if None
+        Output:
+        - returns the path of the written file
+        """
+        if fileName is None:
+            fileName = os.path.splitext(os.path.basename(self.filePath))[0]
+        return self.__drawGraph(fileName, fmt, nodes)
+
+    @property
+    def graph(self):
+        """
+        The MultiDiGraph of the netlist, built on the first use
+        """
+        if self.__graph is None:
+            with self.__timer("buildGraph"):
+                self.__buildGraph()
+        return self.__graph
+
+    def __compactLayout(self, graph):
+        """
+        A function that closes the gaps left in the columns of a sub-graph
+        Input:
+        - graph: A sub-graph of the graph
+        Output:
+        - returns a copy of the sub-graph with the nodes of each column stacked from the top
+        """
+        graph = nx.MultiDiGraph(graph)
+        rows = {}
+        pos = nx.get_node_attributes(graph, 'pos')
+        for node, (x, y) in sorted(pos.items(), key=lambda item: (item[1][0], -item[1][1])):
+            # GND and VCC stay above the columns
+            if y > 0:
+                continue
+            graph.nodes[node]['pos'] = (x, -10*rows.get(x, 0))
+            rows[x] = rows.get(x, 0) + 1
+        return graph
+
+    def __buildGraph(self):
+        """
+        A function that builds the MultiDiGraph of the netlist with the layout of the drawing
+        Each kind of node is placed in its own column, so the layout of the TMR cells is
+        only computed here, when the graph is drawn
+        """
+        graph = self.__graph = nx.MultiDiGraph()
+        rows = {}
+
+        def place(node, column, color, size):
+            graph.add_node(node, pos=(column, -10*rows.get(column, 0)), color=color, size=size)
+            rows[column] = rows.get(column, 0) + 1
+
+        # Add the input and output data types to the graph
+        for i in self.dataTypes["input"]:
+            place(i, 0, 'blue', 5000)
+        for i in self.dataTypes["output"]:
+            place(i, 50, 'green', 5000)
+        # Add the modules to the graph
+        for name, mod in self.cellTypes.items():
+            role = self.tmrRoles.get(name)
+            if role == "and":
+                place(name, 35, 'beige', 30000)
+            elif role == "or":
+                place(name, 38, 'cyan', 30000)
             else:
-                self.graph.add_node(moduleKeys[i], pos=(
-                    30, -10*cfg), color='orange', size=60000)
-                cfg += 1
-        # Add the ARI1 modules to the graph
-        x = 0
-        for i in self.ari1.keys():
-            self.graph.add_node(i, pos=(20, -10*x), color='orange', size=60000)
-            x += 1
+                column, color, size = cellLayout.get(mod, cellLayout["CFG"])
+                place(name, column, 'magenta' if role == "copy" else color, size)
         # Add VCC and GND to the graph
-        self.graph.add_node("GND", pos=(10, 20), color='grey', size=5000)
-        self.graph.add_node("VCC", pos=(30, 20), color='grey', size=5000)
-        # For each INBUF, add an edge
-        for i in self.dataTypes["input"]:
-            if i+"_ibuf" in moduleKeys:
-                self.graph.add_edge(i, i+"_ibuf", color='black')
-        # For each OUTBUF, add an edge
+        graph.add_node("GND", pos=(10, 20), color='grey', size=5000)
+        graph.add_node("VCC", pos=(30, 20), color='grey', size=5000)
+        inputs = set(self.dataTypes["input"])
+        # Add an edge from the driver of each input of a module
+        for name in self.cellTypes:
+            colors = self.__outputColors(name)
+            for port, net in self.ports[name].items():
+                if port in colors:
+                    continue
+                if net == "GND" or net == "VCC" or net in inputs:
+                    graph.add_edge(net, name, color='black')
+                elif net in self.drivers:
+                    node, color = self.__findNode(net)
+                    graph.add_edge(node, name, color=color)
+        # Add an edge from the driver of each output
         for i in self.dataTypes["output"]:
-            if i+"_obuf" in moduleKeys:
-                self.graph.add_edge(i+"_obuf", i, color='black')
-        for x, y in self.modules.items():
-            # For TRIBUFF module
-            if x.endswith("obuft"):
-                if y[0] in self.dataTypes["output"]:
-                    self.graph.add_edge(x, y[0], color='black')
-                self.graph.add_edge("GND", x, color='black')
-                self.graph.add_edge("GND", x, color='black')
-            # For OUTBUF / CFG1 / CFG2 / CFG3 / CFG4 modules
-            elif not x.endswith("ibuf"):
-                for j in range(1, len(y), 1):
-                    if y[j] == "GND" or y[j] == "VCC":
-                        self.graph.add_edge(y[j], x, color='black')
-                    else:
-                        node, color = self.__findNode(y[j])
-                        self.graph.add_edge(node, x, color=color)
-        # For ARI1 modules
-        for x, y in self.ari1.items():
-            for j in range(3, len(y), 1):
-                if y[j] == "GND" or y[j] == "VCC":
-                    self.graph.add_edge(y[j], x)
-                else:
-                    node, color = self.__findNode(y[j])
-                    self.graph.add_edge(node, x, color=color)
+            if i in self.drivers:
+                node, color = self.__findNode(i)
+                graph.add_edge(node, i, color=color)
+
+    def construct(self, draw=True):
+        """
+        A function that constructs and draws the graph from the parsed vm file
+        The simulation runs on the compact netlist, the MultiDiGraph is only built for drawing
+        Input:
+        - draw: Draw the graph to the Output folder, True for a .png or the format to export
+        """
+        self.__reportNets()
+        # Levelize the cells in the compact netlist, unless it is loaded from the cache
+        if self.netlist is None:
+            with self.__timer("levelize"):
+                self.netlist = Netlist(self.dataTypes["input"], self.dataTypes["output"],
+                                       self.cellTypes, self.ports, self.truthTables)
+            if self.cacheDir is not None:
+                with self.__timer("cacheSave"):
+                    saveCache(self.cacheDir, self.filePath,
+                              {key: getattr(self, key) for key in cachedAttributes})
+        if self.stats is not None:
+            self.stats.count("cells", len(self.netlist.cellNames))
+            self.stats.count("nets", len(self.netlist.netNames))
+            self.stats.count("carryChains", len(self.netlist.chainHeads))
         # Draw the graph on the plt canvas
-        self.__drawGraph(os.path.splitext(os.path.basename(self.filePath))[0])
+        if draw:
+            self.draw("png" if draw is True else draw)
 
-    def simulate(self):
+    def simulate(self, vectors=None):
         """
         A function that simulates the vm file for the given input 
+        Input:
+        - vectors: The vectors to simulate
+            - None: The value of each input is prompted for
+            - dict: A single vector as input -> value
+            - Otherwise: A vector file or an iterable of vectors, see simulateBatch
+        Output:
+        - out: The output -> value for a single vector, else the output matrix
         """
-        # Get the longest path in the graph
-        maxRange = nx.algorithms.dag.dag_longest_path_length(self.graph)
-        inputValue = {}
-        print('\x1b[1;32;49m' +
-              "\nInput values for simulation of the circuit:" + '\x1b[0m')
-        for i in self.dataTypes["input"]:
-            inputValue[i] = input(
-                '\x1b[0;36;49m' + f"Enter the value for input {i}: " + '\x1b[0m')
-        print()
-        # For each edge to the successor of GND, add weight as 0
-        for i in self.graph.successors("GND"):
-            self.graph["GND"][i][0]["weight"] = "0"
-        # For each edge to the successor of GND, add weight as 1
-        for i in self.graph.successors("VCC"):
-            self.graph["VCC"][i][0]["weight"] = "1"
-        # For each edge to the INBUF module and its successors, add corresponding weight
-        for i in self.dataTypes["input"]:
-            try:
-                self.graph[i][i+"_ibuf"][0]["weight"] = inputValue[i]
-                for j in self.graph.successors(i+"_ibuf"):
-                    self.graph[i+"_ibuf"][j][0]["weight"] = inputValue[i]
-            except:
-                pass
-        # Loop through the range of longest path
-        # As there are weight dependencies among the modules
-        for a in range(maxRange):
-            # Loop through the defparams
-            for i, j in self.defparam.items():
-                # Split the hexadecimal value where
-                # 0: Length of the number
-                # 2: The hexadecimal number
-                y = j.replace("'", " '")
-                y = y.replace("h", "h ").split()
-                # If it is CFG1 / CG2 / CFG3 / CFG4 / INBUF / OUTBUF / TRIBUFF module
-                if i in self.modules.keys():
-                    # Convert the hexadecimal number to binary
-                    bNum1 = bin(int(y[2], 16))[2:].zfill(int(y[0]))[::-1]
-                    x = ""
-                    # Get the index for retriving the output
-                    try:
-                        for src, dest, data in self.graph.in_edges(i, data=True):
-                            x += str(data['weight'])
-                    except:
-                        continue
-                    # Revert the index
-                    x = x[::-1]
-                    # Add the weight to the edges leading to its successors
-                    for k in self.graph.successors(i):
-                        self.graph[i][k][0]["weight"] = bNum1[int(x, 2)]
-                # If it is ARI1 module
-                elif i in self.ari1.keys():
-                    # bNum1: init[0:15]
-                    # bNum2: init[17:16]
-                    # bNum3: init[19:18]
-                    bNum = bin(int(y[2], 16))[2:].zfill(y[0])
-                    bNum1 = bNum[4:][::-1]
-                    bNum2 = bNum[2:4]
-                    bNum3 = bNum[:2]
-                    x = ""
-                    # Get the index for retriving the output
-                    try:
-                        for src, dest, data in self.graph.in_edges(i, data=True):
-                            x += str(data['weight'])
-                    except:
-                        continue
-                    x = x[::-1]
-                    # Get the adcb, fc1, dcb
-                    adcb = x[:4]
-                    fci = x[4]
-                    dcb = x[:3]
-                    # Calculate f0, f1 with keeping a = 0 and a = 1 respectively
-                    y = bNum1[int(adcb, 2)]
-                    f0 = bNum1[int('0'+dcb, 2)]
-                    f1 = bNum1[int('1'+dcb, 2)]
-                    # Generate s from the truth table
-                    if y+fci == "00" or y+fci == "11":
-                        s = 0
-                    elif y+fci == "01" or y+fci == "10":
-                        s = 1
-                    # Get p and g values for the given input
-                    g = getG(bNum2, f0, f1)
-                    p = getP(bNum3, y)
-                    # Generate the fco from the truth table
-                    if p == '0':
-                        fco = g
-                    else:
-                        fco = fci
-                    # For each out edges of i
-                    # Check the color of the edge and add corresponding weight
-                    for src, dest, data in self.graph.out_edges(i, data=True):
-                        if data["color"] == "green":
-                            data['weight'] = fco
-                        if data["color"] == "blue":
-                            data['weight'] = s
-                        if data["color"] == "red":
-                            data['weight'] = y
-
+        if vectors is not None and not isinstance(vectors, dict):
+            return self.simulateBatch(vectors)
+        inputValue = vectors
+        if inputValue is None:
+            inputValue = {}
+            print('\x1b[1;32;49m' +
+                  "\nInput values for simulation of the circuit:" + '\x1b[0m')
+            for i in self.dataTypes["input"]:
+                inputValue[i] = input(
+                    '\x1b[0;36;49m' + f"Enter the value for input {i}: " + '\x1b[0m')
+            print()
+        # Evaluate every module once in the levelized order
+        with self.__timer("simulate"):
+            values = self.netlist.evaluate(valueBits(inputValue, self.dataTypes["input"]))
+        if self.stats is not None:
+            self.stats.count("vectors")
+            self.stats.count("sweeps")
+            self.__countSweeps(1)
+        netIds = self.netlist.netIds
+        # Add the net values as the weights of the edges, if the graph is built
+        if self.__graph is not None:
+            for src, dest, data in self.__graph.edges(data=True):
+                net = src
+                if self.cellTypes.get(src) == "ARI1":
+                    net = self.ports[src][ari1Ports[data["color"]]]
+                elif src in self.modules:
+                    net = self.modules[src][0]
+                data["weight"] = str(values[netIds[net]] if net in netIds else 0)
         out = {}
-        # For each edge from OUTBUF, add corresponding weights
-        for i in self.dataTypes["output"]:
-            try:
-                for j in self.graph.predecessors(i):
-                    for k in self.graph.predecessors(j):
-                        weight = self.graph[k][j][0]["weight"]
-                        self.graph[j][i][0]["weight"] = weight
-                        out[i] = weight
-            except:
-                pass
-        print('\x1b[1;32;49m' + "Simulation output:" + '\x1b[0m')
-        for i, j in out.items():
-            print('\x1b[0;35;49m' + i + '\x1b[0m', end=": ")
-            print(j)
-        print()
+        for i, net in zip(self.dataTypes["output"], self.netlist.outputIds):
+            out[i] = values[net]
+        if self.verbose:
+            print('\x1b[1;32;49m' + "Simulation output:" + '\x1b[0m')
+            for i, j in out.items():
+                print('\x1b[0;35;49m' + i + '\x1b[0m', end=": ")
+                print(j)
+            print()
+        return out
+
+    def simulateBatch(self, vectors, batchSize=4096):
+        """
+        A function that simulates many input vectors at once
+        The vectors are packed batchSize at a time into one integer word per net
+        and every module is evaluated bitwise once per batch
+        Input:
+        - vectors: Path of a vector file or an iterable of vectors, each vector is a string
+            of 0 / 1 or a sequence of bits in the order of dataTypes["input"]
+        - batchSize: The number of vectors packed in a word
+        Output:
+        - out: The output matrix, one row of bits per vector in the order of dataTypes["output"]
+        """
+        if isinstance(vectors, str):
+            vectors = readStimulus(vectors)
+        out = []
+        with self.__timer("simulateBatch"):
+            for batch in self.__batches(vectors, batchSize):
+                out.extend(self.__simulateWords(batch))
+        if self.stats is not None:
+            # A sweep evaluates every cell once for a whole batch
+            sweeps = -(-len(out) // batchSize)
+            self.stats.count("vectors", len(out))
+            self.stats.count("sweeps", sweeps)
+            self.__countSweeps(sweeps)
+        return out
+
+    def simulateStream(self, source, target, inputFormat=None, outputFormat=None,
+                       batchSize=4096, workers=None, chunkSize=1 << 16, progress=None,
+                       outputs=None):
+        """
+        A function that simulates a stimulus file into a response file with constant memory
+        The vectors are read lazily, simulated batchSize at a time and the output rows
+        are written as soon as each batch is done. With workers the batches are sharded
+        across a process pool, see simulateParallel
+        Input:
+        - source: Path of the stimulus file (text / binary / npy), an open text file
+            or an iterable of vectors in the order of dataTypes["input"]
+        - target: Path of the response file or an open file, the rows are in the
+            order of outputs
+        - inputFormat: text / binary / npy, from the extension of the path if None
+        - outputFormat: text / binary / npy, from the extension of the path if None
+        - batchSize: The number of vectors packed in a word
+        - workers: The number of processes of simulateParallel, in-process if None
+        - chunkSize: The number of vectors sent to a worker at a time
+        - progress: A Progress updated after each merged chunk, with workers
+        - outputs: Only simulate the cone of influence of these outputs, all the outputs
+            if None, see coneNetlist
+        Output:
+        - returns the number of simulated vectors
+        """
+        if isinstance(source, str) or hasattr(source, "read"):
+            source = readStimulus(source, inputFormat)
+        netlist, columns = self.netlist, None
+        if outputs is not None:
+            netlist, columns = self.coneNetlist(outputs)
+        with ResponseWriter(target, len(netlist.outputIds), outputFormat) as writer:
+            if workers is not None:
+                writer.writeRows(self.simulateParallel(source, workers, chunkSize, batchSize,
+                                                       progress, outputs))
+                return writer.rows
+            sweeps = 0
+            with self.__timer("simulateStream"):
+                for batch in self.__batches(source, batchSize):
+                    writer.writeRows(simulateWords(netlist, batch, columns))
+                    sweeps += 1
+        if self.stats is not None:
+            self.stats.count("vectors", writer.rows)
+            self.stats.count("sweeps", sweeps)
+            self.__countSweeps(sweeps, netlist)
+        return writer.rows
+
+    def simulateParallel(self, vectors, workers=None, chunkSize=1 << 16, batchSize=4096,
+                         progress=None, outputs=None):
+        """
+        A function that simulates a large stream of vectors across a process pool
+        The stream is cut into chunks of chunkSize vectors, the workers share the compiled
+        netlist through fork and the output rows are yielded in the order of the vectors
+        as the chunks are merged, so neither the vectors nor the rows are all in memory
+        Input:
+        - vectors: Path of a vector file or an iterable of vectors, see simulateBatch
+        - workers: The number of processes, all the cores if None, in-process if 1
+        - chunkSize: The number of vectors sent to a worker at a time
+        - batchSize: The number of vectors packed in a word
+        - progress: A Progress updated after each merged chunk, for the progress and
+            the throughput
+        - outputs: Only simulate the cone of influence of these outputs, all the outputs
+            if None, see coneNetlist
+        Output:
+        - yields the output rows, one row of bits per vector in the order of outputs
+        """
+        netlist, columns = self.netlist, None
+        if outputs is not None:
+            netlist, columns = self.coneNetlist(outputs)
+        if isinstance(vectors, str):
+            vectors = readStimulus(vectors)
+        if progress is None and self.verbose:
+            progress = Progress(lambda p: print(
+                f"\r{p.vectors} vectors, {p.rate:.0f} vectors/s", end="", file=sys.stderr))
+        count = 0
+        sweeps = 0
+        with self.__timer("simulateParallel"):
+            for rows in simulateSharded(netlist, self.__batches(vectors, chunkSize),
+                                        workers, batchSize, progress, columns):
+                count += len(rows)
+                # A chunk is swept batchSize vectors at a time in its worker
+                sweeps += -(-len(rows) // batchSize)
+                yield from rows
+        if self.verbose:
+            print(file=sys.stderr)
+        if self.stats is not None:
+            self.stats.count("vectors", count)
+            self.stats.count("sweeps", sweeps)
+            self.__countSweeps(sweeps, netlist)
+
+    def simulateIncremental(self, vectors):
+        """
+        A function that simulates a sequence of vectors event-driven
+        The net values of the previous vector are kept and only the fanout cones of the
+        inputs that changed are re-evaluated, which also gives the switching activity
+        Input:
+        - vectors: Path of a vector file or an iterable of vectors, see simulateBatch
+        Output:
+        - out: The output matrix, one row of bits per vector in the order of dataTypes["output"]
+        - toggles: The number of nets that toggled for each vector
+        """
+        if isinstance(vectors, str):
+            vectors = readStimulus(vectors)
+        length = len(self.dataTypes["input"])
+        outputIds = self.netlist.outputIds
+        values = self.netlist.values
+        out = []
+        toggles = []
+        evaluated = [0] * len(typeNames) if self.stats is not None else None
+        with self.__timer("simulateIncremental"):
+            for vector in vectors:
+                toggles.append(self.netlist.step([int(b) for b in vectorBits(vector, length)],
+                                                 evaluated))
+                out.append([values[net] for net in outputIds])
+        if self.stats is not None:
+            self.stats.count("vectors", len(out))
+            self.stats.count("toggles", sum(toggles))
+            for t, n in enumerate(evaluated):
+                if n > 0:
+                    self.stats.countCells(typeNames[t], n)
+        return out, toggles
+
+    def faultCampaign(self, vectors, tmrNodes=None, models=faultModels, workers=None):
+        """
+        A function that runs a stuck-at and bit-flip fault injection campaign
+        Input:
+        - vectors: Path of a vector file or an iterable of vectors, see simulateBatch
+        - tmrNodes: The modules to triplicate, to compare the campaign before and after TMR
+        - models: The fault models to inject (sa0, sa1, flip)
+        - workers: The number of processes, all the cores if None
+        Output:
+        - reports: The report of the "original" netlist, and of the "tmr" netlist if
+            tmrNodes is given
+        """
+        if isinstance(vectors, str):
+            vectors = readStimulus(vectors)
+        length = len(self.dataTypes["input"])
+        vectors = [vectorBits(vector, length) for vector in vectors]
+        with self.__timer("faultCampaign"):
+            reports = {"original": FaultCampaign(self.netlist, vectors, models).run(workers)}
+        if tmrNodes is not None:
+            cellTypes, ports, truthTables = dict(self.cellTypes), dict(self.ports), dict(self.truthTables)
+            triplicate(cellTypes, ports, truthTables, tmrNodes)
+            hardened = Netlist(self.dataTypes["input"], self.dataTypes["output"],
+                               cellTypes, ports, truthTables)
+            with self.__timer("faultCampaign"):
+                reports["tmr"] = FaultCampaign(hardened, vectors, models).run(workers)
+        return reports
+
+    def checkEquivalence(self, other, exhaustive=None, count=randomVectors, seed=None):
+        """
+        A function that checks that another graph computes the same outputs, e.g. after TMR
+        All the vectors are checked on the small designs and random vectors on the large ones,
+        bit-parallel, and the check stops at the first mismatch
+        Input:
+        - other: The Graph to compare with, with the same inputs and outputs
+        - exhaustive: Check all the vectors if True, random vectors if False,
+            all the vectors up to exhaustiveInputs inputs if None
+        - count: The number of random vectors
+        - seed: The seed of the random vectors
+        Output:
+        - result: The mode, the number of checked vectors and the counterexample,
+            the counterexample is None if the graphs are equivalent
+        """
+        with self.__timer("checkEquivalence"):
+            result = checkEquivalence(self.netlist, other.netlist, self.dataTypes["input"],
+                                      self.dataTypes["output"], exhaustive, count, seed)
+        if self.stats is not None:
+            self.stats.count("equivalenceVectors", result["vectors"])
+        counterexample = result["counterexample"]
+        if counterexample is not None:
+            print('\x1b[1;31;49m' + f"Not equivalent, mismatch after {result['vectors']} "
+                  f"{result['mode']} vectors:" + '\x1b[0m')
+            for key in ("inputs", "expected", "actual"):
+                print('\x1b[0;35;49m' + key + '\x1b[0m', end=": ")
+                print(" ".join(f"{i}={j}" for i, j in counterexample[key].items()))
+            print()
+        elif self.verbose:
+            print('\x1b[1;32;49m' + f"Equivalent on {result['vectors']} {result['mode']} vectors"
+                  + '\x1b[0m\n')
+        return result
+
+    def timingReport(self, delays=None):
+        """
+        A function that analyzes the logic depth and the critical paths of the netlist
+        After applyTMR the report is compared with the netlist before the first TMR
+        Input:
+        - delays: The cell type -> delay table, None for unit delays
+        Output:
+        - report: The TimingReport of the netlist
+        """
+        with self.__timer("timing"):
+            baseline = None
+            if self.baseNetlist is not None:
+                baseline = TimingReport(self.baseNetlist, delays)
+            report = TimingReport(self.netlist, delays, baseline)
+        if self.stats is not None:
+            self.stats.count("timingNets", len(self.netlist.netNames))
+        return report
+
+    def __batches(self, vectors, size):
+        """
+        A function that cuts a stream of vectors into batches
+        Input:
+        - vectors: An iterable of vectors, see simulateBatch
+        - size: The number of vectors of a batch
+        Output:
+        - yields the batches, lists of vectors as strings of 0 / 1
+        """
+        length = len(self.dataTypes["input"])
+        batch = []
+        for vector in vectors:
+            batch.append(vectorBits(vector, length))
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
+
+    def __simulateWords(self, batch):
+        """
+        A function that packs a batch of vectors, evaluates it and unpacks the outputs
+        Input:
+        - batch: The list of vectors as strings of 0 / 1
+        Output:
+        - returns the output rows of the batch
+        """
+        return simulateWords(self.netlist, batch)
 
     def TMRApproach(self):
         """
         A function that simulates the triple mode redundancy (TMR) approach
+        for the nodes given by the user
         """
-        plt.clf()
         inputNodes = list(input(
             '\x1b[0;36;49m' + "Enter the nodes to be duplicated(seperated by a space): " + '\x1b[0m').strip().split())
-        pos = nx.get_node_attributes(self.graph, 'pos')
-        orIdx = 0
-        andIdx = 0
-        # For each input module
-        for node in inputNodes:
-            # If the input is not a module, raise an exception
-            if node not in list(self.modules.keys()) + list(self.ari1.keys()):
+        self.applyTMR(inputNodes)
+
+    def applyTMR(self, inputNodes=None, predicate=None, draw=True):
+        """
+        A function that applies the triple mode redundancy (TMR) approach in one bulk pass
+        Each selected module is replaced by three copies and every net it drives gets one
+        voter (three ANDs and one OR) shared by all the readers of the net. The compact
+        netlist is rebuilt, so the voters are evaluated by simulate
+        Input:
+        - inputNodes: The modules to be triplicated
+        - predicate: A function (module, cell type) -> bool selecting the modules to be
+            triplicated, e.g. lambda name, mod: mod == "CFG4"
+        - draw: Draw the graph to the Output folder, True for a .png or the format to export
+        Output:
+        - returns the triplicated modules
+        """
+        selected = list(inputNodes) if inputNodes is not None else []
+        if predicate is not None:
+            selected += [name for name, mod in self.cellTypes.items()
+                         if name not in self.tmrRoles and predicate(name, mod)]
+        # If an input is not a module or is a copy already, raise an exception
+        for node in selected:
+            if node not in self.cellTypes:
                 raise ValueError("Module not in the file.")
-            # If the input is a module
-            else:
-                # Retrive the in edges and out edges on the node
-                inEdges = self.graph.in_edges(node, data=True)
-                inData = []
-                for src, dest, data in inEdges:
-                    inData.append((src, dest, data))
-                outEdges = self.graph.out_edges(node, data=True)
-                outData = []
-                for src, dest, data in outEdges:
-                    outData.append((src, dest, data))
-                currPos = pos[node]
-                andGate1 = "and"+str(andIdx)
-                andGate2 = "and"+str(andIdx+1)
-                andGate3 = "and"+str(andIdx+2)
-                orGate = "or"+str(orIdx)
-                # Update the positions of the modules
-                for mod, position in pos.items():
-                    if currPos[0] == position[0] and currPos[1] > position[1]:
-                        pos[mod] = (position[0], position[1]-20)
-                nx.set_node_attributes(self.graph, pos, 'pos')
-                # Remove the current node
-                self.graph.remove_node(node)
-                # Add the new three nodes of the module
-                self.graph.add_node(
-                    node+"_0", pos=(currPos[0], currPos[1]), color='magenta', size=60000)
-                self.graph.add_node(
-                    node+"_1", pos=(currPos[0], currPos[1]-10), color='magenta', size=60000)
-                self.graph.add_node(
-                    node+"_2", pos=(currPos[0], currPos[1]-20), color='magenta', size=60000)
-                # Add the AND and OR gates
-                self.graph.add_node(
-                    andGate1, pos=(currPos[0]+5, currPos[1]), color='beige', size=30000)
-                self.graph.add_node(
-                    andGate2, pos=(currPos[0]+5, currPos[1]-10), color='beige', size=30000)
-                self.graph.add_node(
-                    andGate3, pos=(currPos[0]+5, currPos[1]-20), color='beige', size=30000)
-                self.graph.add_node(
-                    orGate, pos=(currPos[0]+8, currPos[1]-10), color='cyan', size=30000)
-                # For each in edge
-                for src, dest, data in inData:
-                    # Duplicates the edges to all the three nodes
-                    self.graph.add_edge(
-                        src, node+"_0", weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        src, node+"_1", weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        src, node+"_2", weight=data["weight"], color=data["color"])
-                # For each out edge
-                for src, dest, data in outData:
-                    # Pass the node outputs to the AND gates
-                    self.graph.add_edge(
-                        node+"_0", andGate1, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        node+"_1", andGate1, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        node+"_1", andGate2, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        node+"_2", andGate2, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        node+"_2", andGate3, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        node+"_0", andGate3, weight=data["weight"], color=data["color"])
-                    # Pass the AND gate outputs to the OR gate
-                    self.graph.add_edge(
-                        andGate1, orGate, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        andGate2, orGate, weight=data["weight"], color=data["color"])
-                    self.graph.add_edge(
-                        andGate3, orGate, weight=data["weight"], color=data["color"])
-                    # Pass the OR gate output to the destination
-                    self.graph.add_edge(
-                        orGate, dest, weight=data["weight"], color=data["color"])
-                orIdx += 1
-                andIdx += 3
+            if self.tmrRoles.get(node) == "copy":
+                raise ValueError("Module is already triplicated.")
+        with self.__timer("tmr"):
+            selected = list(dict.fromkeys(selected))
+            for node in selected:
+                self.__unindexCell(node)
+                self.modules.pop(node, None)
+                self.ari1.pop(node, None)
+            roles, sources = triplicate(self.cellTypes, self.ports, self.truthTables, selected)
+            for name, role in roles.items():
+                ports = self.ports[name]
+                if self.cellTypes[name] == "ARI1":
+                    self.ari1[name] = list(ports.values())
+                else:
+                    output = bufferOutputs.get(self.cellTypes[name], "Y")
+                    self.modules[name] = [ports[output]] + \
+                        [net for port, net in ports.items() if port != output]
+                if role != "copy":
+                    self.defparam[name] = tmrInits[role]
+                elif sources[name] in self.defparam:
+                    self.defparam[name] = self.defparam[sources[name]]
+                self.__indexCell(name)
+            for node in selected:
+                self.defparam.pop(node, None)
+                self.tmrRoles.pop(node, None)
+            self.tmrRoles.update(roles)
+            # The simulation netlist is rebuilt and the graph is rebuilt when it is used
+            if self.baseNetlist is None:
+                self.baseNetlist = self.netlist
+            self.netlist = Netlist(self.dataTypes["input"], self.dataTypes["output"],
+                                   self.cellTypes, self.ports, self.truthTables)
+            self.cones = {}
+        if self.stats is not None:
+            self.stats.count("tmrCells", len(selected))
+            self.stats.count("tmrCellsAdded", len(roles))
+        self.__graph = None
         # Draw the graph on the plt canvas
-        self.__drawGraph(os.path.splitext(
-            os.path.basename(self.filePath))[0]+"_TMR")
+        if draw:
+            self.draw("png" if draw is True else draw, fileName=os.path.splitext(
+                os.path.basename(self.filePath))[0]+"_TMR")
+        return selected
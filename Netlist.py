@@ -0,0 +1,599 @@
+from array import array
+
+# Cell type codes of the netlist
+INBUF, OUTBUF, TRIBUFF, CFG1, CFG2, CFG3, CFG4, ARI1 = range(8)
+typeCodes = {
+    "INBUF": INBUF,
+    "OUTBUF": OUTBUF,
+    "TRIBUFF": TRIBUFF,
+    "CFG1": CFG1,
+    "CFG2": CFG2,
+    "CFG3": CFG3,
+    "CFG4": CFG4,
+    "ARI1": ARI1
+}
+typeNames = list(typeCodes.keys())
+
+# The input and output ports of each cell type in the order of evaluation
+portOrder = {
+    "INBUF": (("PAD",), ("Y",)),
+    "OUTBUF": (("D",), ("PAD",)),
+    "TRIBUFF": (("D", "E"), ("PAD",)),
+    "CFG1": (("A",), ("Y",)),
+    "CFG2": (("A", "B"), ("Y",)),
+    "CFG3": (("A", "B", "C"), ("Y",)),
+    "CFG4": (("A", "B", "C", "D"), ("Y",)),
+    "ARI1": (("A", "B", "C", "D", "FCI"), ("Y", "S", "FCO"))
+}
+
+# Truth table of the cells without a defparam
+noTable = -1
+
+
+def lutWord(table, inputs, ones):
+    """
+    Evaluate a LUT bitwise on packed input words
+    Input:
+    - table: The truth table, bit i is the output for index i
+    - inputs: The packed words of the LUT inputs, the LSB of the index first
+    - ones: The word with the bit of every packed vector set
+    Output:
+    - returns the packed output word
+    """
+    # Start from the truth table and mux away one input at a time
+    level = [ones if (table >> m) & 1 else 0 for m in range(1 << len(inputs))]
+    for x in inputs:
+        level = [f0 ^ ((f0 ^ f1) & x) for f0, f1 in zip(level[0::2], level[1::2])]
+    return level[0]
+
+
+class Netlist:
+    """
+    A compact array-backed netlist used for the simulation
+
+    Nets and cells are integer IDs, the connections are stored as CSR arrays
+    (the pins of cell c are faninNets[faninStart[c]:faninStart[c + 1]]) and the
+    net values live in a flat bytearray
+
+    Attributes:
+    - netNames: The name of each net, net 0 is GND and net 1 is VCC, the dangling net of an
+        unconnected output is named cell.port and is not in netIds
+    - netIds: The net name -> net ID
+    - cellNames: The name of each cell
+    - cellIds: The cell name -> cell ID
+    - types: The type code of each cell
+    - tables: The truth table of each cell, the full INIT[19:0] for ARI1
+    - faninStart, faninNets: The input nets of each cell in the order of portOrder
+    - outStart, outNets: The output nets of each cell in the order of portOrder
+    - fanoutStart, fanoutCells: The cells reading each net
+    - drivers: The cell driving each net, -1 for the primary inputs, GND, VCC and undriven nets
+    - inputIds, outputIds: The nets of the primary inputs and outputs
+    - levels: The logic level of each cell
+    - chainNext: The next cell of the ARI1 carry chain of each cell, -1 at the end of a
+        chain and for the cells that are not in a fused chain
+    - chainHeads: The first cell of each fused ARI1 carry chain
+    - order: The cells in evaluation order, a fused chain appears once as its first cell
+    - values: The value of each net after the last evaluate
+    - settled: Whether values holds a fully evaluated vector, for step
+    - scheduled: The cells waiting to be evaluated by step
+
+    Functions:
+    - Private:
+        - __init__
+        - __netId
+        - __levelize
+        - __findChains
+        - __fuseChains
+        - __evaluateCell
+    - Public:
+        - evaluate
+        - step
+        - evaluateWords
+        - evaluateCellWords
+        - evaluateChainWords
+        - forwardCone
+        - faninCone
+    """
+
+    __slots__ = ("netNames", "netIds", "cellNames", "cellIds", "types", "tables",
+                 "faninStart", "faninNets", "outStart", "outNets",
+                 "fanoutStart", "fanoutCells", "drivers",
+                 "inputIds", "outputIds", "levels", "chainNext", "chainHeads", "order",
+                 "values", "settled", "scheduled")
+
+    def __init__(self, inputs, outputs, cellTypes, ports, truthTables):
+        """
+        Input:
+        - inputs: The primary inputs
+        - outputs: The primary outputs
+        - cellTypes: The cell -> cell type of every instance
+        - ports: The cell -> {port: net} connections of every instance
+        - truthTables: The cell -> truth table decoded from the defparams
+        """
+        self.netNames = ["GND", "VCC"]
+        self.netIds = {"GND": 0, "VCC": 1}
+        self.cellNames = list(cellTypes.keys())
+        self.cellIds = {name: i for i, name in enumerate(self.cellNames)}
+        self.types = array('B')
+        self.tables = array('q')
+        self.faninStart = array('i', [0])
+        self.faninNets = array('i')
+        self.outStart = array('i', [0])
+        self.outNets = array('i')
+        for name in inputs + outputs:
+            self.__netId(name)
+        for name in self.cellNames:
+            cellType = cellTypes[name]
+            inPorts, outPorts = portOrder[cellType]
+            connections = ports[name]
+            self.types.append(typeCodes[cellType])
+            table = truthTables.get(name, noTable)
+            if cellType == "ARI1" and table != noTable:
+                # Join the split INIT back to INIT[19:0]
+                lut, gSel, pSel = table
+                table = lut | (gSel << 16) | (pSel << 18)
+            self.tables.append(table)
+            for port in inPorts:
+                # The LUTs only use the connected pins, the other cells have a fixed arity
+                if port in connections or not cellType.startswith("CFG"):
+                    self.faninNets.append(self.__netId(connections.get(port, "GND")))
+            self.faninStart.append(len(self.faninNets))
+            for port in outPorts:
+                net = connections.get(port, "GND")
+                if net == "GND" or net == "VCC":
+                    # An unconnected output gets a dangling net, so it never overwrites GND / VCC
+                    self.outNets.append(len(self.netNames))
+                    self.netNames.append(f"{name}.{port}")
+                else:
+                    self.outNets.append(self.__netId(net))
+            self.outStart.append(len(self.outNets))
+        self.inputIds = array('i', [self.netIds[name] for name in inputs])
+        self.outputIds = array('i', [self.netIds[name] for name in outputs])
+        self.values = bytearray(len(self.netNames))
+        self.values[1] = 1
+        self.settled = False
+        self.__levelize()
+        self.scheduled = bytearray(len(self.cellNames))
+
+    def __netId(self, name):
+        """
+        A function that returns the ID of a net, adding it if it is new
+        Input:
+        - name: The name of the net
+        Output:
+        - returns the net ID
+        """
+        net = self.netIds.get(name)
+        if net is None:
+            net = len(self.netNames)
+            self.netIds[name] = net
+            self.netNames.append(name)
+        return net
+
+    def __levelize(self):
+        """
+        A function that builds the driver and fanout arrays and sorts the cells by level
+        The level of a cell is one more than the highest level of the cells driving its inputs
+        """
+        nets = len(self.netNames)
+        cells = len(self.cellNames)
+        self.drivers = array('i', [-1]) * nets
+        for c in range(cells):
+            for i in range(self.outStart[c], self.outStart[c + 1]):
+                if self.drivers[self.outNets[i]] == -1:
+                    self.drivers[self.outNets[i]] = c
+        # Count the readers of each net and fill the fanout CSR
+        counts = array('i', [0]) * (nets + 1)
+        for net in self.faninNets:
+            counts[net + 1] += 1
+        for net in range(nets):
+            counts[net + 1] += counts[net]
+        self.fanoutStart = array('i', counts)
+        self.fanoutCells = array('i', [0]) * len(self.faninNets)
+        fill = array('i', counts)
+        pending = array('i', [0]) * cells
+        for c in range(cells):
+            for i in range(self.faninStart[c], self.faninStart[c + 1]):
+                net = self.faninNets[i]
+                self.fanoutCells[fill[net]] = c
+                fill[net] += 1
+                if self.drivers[net] != -1:
+                    pending[c] += 1
+        # Kahn's algorithm over the cells, a cell is ready once all its drivers are evaluated
+        self.levels = array('i', [0]) * cells
+        ready = [c for c in range(cells) if pending[c] == 0]
+        order = array('i')
+        while len(ready) > 0:
+            c = ready.pop()
+            order.append(c)
+            for i in range(self.outStart[c], self.outStart[c + 1]):
+                net = self.outNets[i]
+                if self.drivers[net] != c:
+                    continue
+                for j in range(self.fanoutStart[net], self.fanoutStart[net + 1]):
+                    reader = self.fanoutCells[j]
+                    if self.levels[reader] < self.levels[c] + 1:
+                        self.levels[reader] = self.levels[c] + 1
+                    pending[reader] -= 1
+                    if pending[reader] == 0:
+                        ready.append(reader)
+        if len(order) != cells:
+            raise ValueError("The netlist has a combinational loop.")
+        self.__findChains()
+        self.__fuseChains()
+
+    def __findChains(self):
+        """
+        A function that links the ARI1 cells whose FCO only drives the FCI of the next ARI1
+        """
+        types = self.types
+        self.chainNext = array('i', [-1]) * len(self.cellNames)
+        hasPrevious = set()
+        for c in range(len(self.cellNames)):
+            if types[c] != ARI1 or self.tables[c] == noTable:
+                continue
+            fci = self.faninNets[self.faninStart[c] + 4]
+            d = self.drivers[fci] if fci > 1 else -1
+            if d != -1 and types[d] == ARI1 and self.tables[d] != noTable \
+                    and self.outNets[self.outStart[d] + 2] == fci \
+                    and self.fanoutStart[fci + 1] - self.fanoutStart[fci] == 1:
+                self.chainNext[d] = c
+                hasPrevious.add(c)
+        self.chainHeads = array('i', [c for c in range(len(self.cellNames))
+                                      if self.chainNext[c] != -1 and c not in hasPrevious])
+
+    def __fuseChains(self):
+        """
+        A function that orders the cells with every carry chain as a single unit
+        A chain is evaluated from its first cell to its last once all the inputs coming
+        from outside the chain are ready. A chain whose cells need a value from a later
+        cell of the chain, directly or through other cells, cannot be one unit, so it is
+        split back into single cells
+        """
+        cells = len(self.cellNames)
+        while True:
+            # The unit of each cell and its position in the chain
+            unit = array('i', range(cells))
+            position = array('i', [0]) * cells
+            for head in self.chainHeads:
+                c, k = head, 0
+                while c != -1:
+                    unit[c] = head
+                    position[c] = k
+                    c, k = self.chainNext[c], k + 1
+            pending = array('i', [0]) * cells
+            broken = set()
+            for c in range(cells):
+                for i in range(self.faninStart[c], self.faninStart[c + 1]):
+                    d = self.drivers[self.faninNets[i]]
+                    if d == -1:
+                        continue
+                    if unit[d] != unit[c]:
+                        pending[unit[c]] += 1
+                    elif position[d] >= position[c]:
+                        broken.add(unit[c])
+            # Kahn's algorithm over the units
+            ready = [c for c in range(cells) if unit[c] == c and pending[c] == 0
+                     and c not in broken]
+            order = array('i')
+            while len(ready) > 0:
+                u = ready.pop()
+                order.append(u)
+                c = u
+                while c != -1:
+                    for i in range(self.outStart[c], self.outStart[c + 1]):
+                        net = self.outNets[i]
+                        if self.drivers[net] != c:
+                            continue
+                        for j in range(self.fanoutStart[net], self.fanoutStart[net + 1]):
+                            reader = unit[self.fanoutCells[j]]
+                            if reader == u:
+                                continue
+                            pending[reader] -= 1
+                            if pending[reader] == 0 and reader not in broken:
+                                ready.append(reader)
+                    c = self.chainNext[c]
+            if len(broken) == 0 and len(order) == sum(1 for c in range(cells) if unit[c] == c):
+                self.order = order
+                return
+            # Split the chains that could not be ordered and try again
+            ordered = set(order)
+            split = broken | {head for head in self.chainHeads if head not in ordered}
+            for head in split:
+                c = head
+                while c != -1:
+                    following = self.chainNext[c]
+                    self.chainNext[c] = -1
+                    c = following
+            self.chainHeads = array('i', [head for head in self.chainHeads if head not in split])
+
+    def evaluate(self, inputBits):
+        """
+        A function that evaluates every cell once in level order for one input vector
+        Input:
+        - inputBits: The value (0 / 1) of each primary input in the order of the inputs
+        Output:
+        - values: The value of each net
+        """
+        values = self.values
+        for net, bit in zip(self.inputIds, inputBits):
+            values[net] = bit
+        # The body of __evaluateCell is inlined here, as this loop runs for every vector
+        types = self.types
+        tables = self.tables
+        faninStart = self.faninStart
+        faninNets = self.faninNets
+        outStart = self.outStart
+        outNets = self.outNets
+        chainNext = self.chainNext
+        for c in self.order:
+            t = types[c]
+            s = faninStart[c]
+            o = outStart[c]
+            table = tables[c]
+            if t == ARI1:
+                if table == noTable:
+                    continue
+                fci = values[faninNets[s + 4]]
+                # A fused carry chain is evaluated to its end with the carry kept in fci
+                while True:
+                    a = values[faninNets[s]]
+                    idx = (values[faninNets[s + 3]] << 2) | (values[faninNets[s + 2]] << 1) \
+                        | values[faninNets[s + 1]]
+                    f0 = (table >> idx) & 1
+                    f1 = (table >> (idx | 8)) & 1
+                    y = f1 if a else f0
+                    g = (0, f0, 1, f1)[(table >> 16) & 3]
+                    p = (0, y, 1, 1)[(table >> 18) & 3]
+                    values[outNets[o]] = y
+                    values[outNets[o + 1]] = y ^ fci
+                    fci = fci if p else g
+                    values[outNets[o + 2]] = fci
+                    c = chainNext[c]
+                    if c == -1:
+                        break
+                    s = faninStart[c]
+                    o = outStart[c]
+                    table = tables[c]
+            elif t == TRIBUFF:
+                values[outNets[o]] = values[faninNets[s]] & values[faninNets[s + 1]]
+            elif table == noTable:
+                values[outNets[o]] = values[faninNets[s]]
+            else:
+                idx = 0
+                for k in range(faninStart[c + 1] - s):
+                    idx |= values[faninNets[s + k]] << k
+                values[outNets[o]] = (table >> idx) & 1
+        self.settled = True
+        return values
+
+    def __evaluateCell(self, c, values):
+        """
+        A function that evaluates one cell and writes its outputs
+        Input:
+        - c: The cell ID
+        - values: The value of each net
+        """
+        faninNets = self.faninNets
+        outNets = self.outNets
+        t = self.types[c]
+        s = self.faninStart[c]
+        o = self.outStart[c]
+        table = self.tables[c]
+        if t == ARI1:
+            if table == noTable:
+                return
+            a = values[faninNets[s]]
+            fci = values[faninNets[s + 4]]
+            # Y is indexed by ADCB, F0 and F1 are Y with A = 0 and A = 1
+            idx = (values[faninNets[s + 3]] << 2) | (values[faninNets[s + 2]] << 1) \
+                | values[faninNets[s + 1]]
+            f0 = (table >> idx) & 1
+            f1 = (table >> (idx | 8)) & 1
+            y = f1 if a else f0
+            g = (0, f0, 1, f1)[(table >> 16) & 3]
+            p = (0, y, 1, 1)[(table >> 18) & 3]
+            values[outNets[o]] = y
+            values[outNets[o + 1]] = y ^ fci
+            values[outNets[o + 2]] = fci if p else g
+        elif t == TRIBUFF:
+            values[outNets[o]] = values[faninNets[s]] & values[faninNets[s + 1]]
+        elif table == noTable:
+            values[outNets[o]] = values[faninNets[s]]
+        else:
+            # The index of the truth table is DCBA
+            idx = 0
+            for k in range(self.faninStart[c + 1] - s):
+                idx |= values[faninNets[s + k]] << k
+            values[outNets[o]] = (table >> idx) & 1
+
+    def step(self, inputBits, evaluated=None):
+        """
+        A function that re-simulates the netlist event-driven for the next input vector
+        Only the fanout cones of the inputs that changed are evaluated, a cell is
+        scheduled when one of its input nets toggles and cells are processed level by level
+        Input:
+        - inputBits: The value (0 / 1) of each primary input in the order of the inputs
+        - evaluated: The number of evaluations of each type code, counted if it is given
+        Output:
+        - toggles: The number of nets that changed value
+        """
+        values = self.values
+        if not self.settled:
+            # The first vector evaluates every cell
+            before = bytes(values)
+            self.evaluate(inputBits)
+            if evaluated is not None:
+                for t in self.types:
+                    evaluated[t] += 1
+            return sum(1 for old, new in zip(before, values) if old != new)
+        levels = self.levels
+        fanoutStart = self.fanoutStart
+        fanoutCells = self.fanoutCells
+        outStart = self.outStart
+        outNets = self.outNets
+        scheduled = self.scheduled
+        buckets = {}
+        toggles = 0
+
+        def schedule(net):
+            for j in range(fanoutStart[net], fanoutStart[net + 1]):
+                reader = fanoutCells[j]
+                if not scheduled[reader]:
+                    scheduled[reader] = 1
+                    buckets.setdefault(levels[reader], []).append(reader)
+
+        for net, bit in zip(self.inputIds, inputBits):
+            if values[net] != bit:
+                values[net] = bit
+                toggles += 1
+                schedule(net)
+        while len(buckets) > 0:
+            # The readers of a cell are always on a higher level
+            level = min(buckets)
+            bucket = buckets.pop(level)
+            if evaluated is not None:
+                for c in bucket:
+                    evaluated[self.types[c]] += 1
+            for c in bucket:
+                scheduled[c] = 0
+                outputs = outNets[outStart[c]:outStart[c + 1]]
+                before = [values[net] for net in outputs]
+                self.__evaluateCell(c, values)
+                for net, old in zip(outputs, before):
+                    if values[net] != old:
+                        toggles += 1
+                        schedule(net)
+        return toggles
+
+    def evaluateWords(self, inputWords, ones):
+        """
+        A function that evaluates every cell once in level order for a batch of packed vectors
+        Bit k of every word holds the value of the net for the k-th vector of the batch
+        Input:
+        - inputWords: The packed word of each primary input in the order of the inputs
+        - ones: The word with the bit of every vector of the batch set
+        Output:
+        - values: The packed word of each net
+        """
+        values = [0] * len(self.netNames)
+        values[1] = ones
+        for net, word in zip(self.inputIds, inputWords):
+            values[net] = word
+        evaluateCellWords = self.evaluateCellWords
+        evaluateChainWords = self.evaluateChainWords
+        chainNext = self.chainNext
+        for c in self.order:
+            if chainNext[c] != -1:
+                evaluateChainWords(c, values, ones)
+            else:
+                evaluateCellWords(c, values, ones)
+        return values
+
+    def evaluateCellWords(self, c, values, ones):
+        """
+        A function that evaluates one cell for a batch of packed vectors
+        Input:
+        - c: The cell ID
+        - values: The packed word of each net
+        - ones: The word with the bit of every vector of the batch set
+        """
+        faninNets = self.faninNets
+        outNets = self.outNets
+        t = self.types[c]
+        s = self.faninStart[c]
+        o = self.outStart[c]
+        table = self.tables[c]
+        if t == ARI1:
+            if table == noTable:
+                return
+            a = values[faninNets[s]]
+            fci = values[faninNets[s + 4]]
+            dcb = (values[faninNets[s + 1]], values[faninNets[s + 2]], values[faninNets[s + 3]])
+            # F0 and F1 are the DCB LUTs with A = 0 and A = 1, Y muxes them with A
+            f0 = lutWord(table & 0xFF, dcb, ones)
+            f1 = lutWord((table >> 8) & 0xFF, dcb, ones)
+            y = f0 ^ ((f0 ^ f1) & a)
+            g = (0, f0, ones, f1)[(table >> 16) & 3]
+            p = (0, y, ones, ones)[(table >> 18) & 3]
+            values[outNets[o]] = y
+            values[outNets[o + 1]] = y ^ fci
+            values[outNets[o + 2]] = g ^ ((g ^ fci) & p)
+        elif t == TRIBUFF:
+            values[outNets[o]] = values[faninNets[s]] & values[faninNets[s + 1]]
+        elif table == noTable:
+            values[outNets[o]] = values[faninNets[s]]
+        else:
+            values[outNets[o]] = lutWord(
+                table, [values[faninNets[i]] for i in range(s, self.faninStart[c + 1])], ones)
+
+    def evaluateChainWords(self, head, values, ones):
+        """
+        A function that evaluates a fused ARI1 carry chain for a batch of packed vectors
+        The Y, G and P words of a cell do not depend on the carry, so each cell costs a
+        few bitwise operations and the carry word is passed along the chain
+        Input:
+        - head: The first cell of the chain
+        - values: The packed word of each net
+        - ones: The word with the bit of every vector of the batch set
+        """
+        faninNets = self.faninNets
+        outNets = self.outNets
+        faninStart = self.faninStart
+        outStart = self.outStart
+        tables = self.tables
+        chainNext = self.chainNext
+        c = head
+        fci = values[faninNets[faninStart[c] + 4]]
+        while c != -1:
+            s = faninStart[c]
+            o = outStart[c]
+            table = tables[c]
+            a = values[faninNets[s]]
+            dcb = (values[faninNets[s + 1]], values[faninNets[s + 2]], values[faninNets[s + 3]])
+            f0 = lutWord(table & 0xFF, dcb, ones)
+            f1 = lutWord((table >> 8) & 0xFF, dcb, ones)
+            y = f0 ^ ((f0 ^ f1) & a)
+            g = (0, f0, ones, f1)[(table >> 16) & 3]
+            p = (0, y, ones, ones)[(table >> 18) & 3]
+            values[outNets[o]] = y
+            values[outNets[o + 1]] = y ^ fci
+            fci = g ^ ((g ^ fci) & p)
+            values[outNets[o + 2]] = fci
+            c = chainNext[c]
+
+    def forwardCone(self, net):
+        """
+        A function that finds the cells in the transitive fanout of a net
+        Input:
+        - net: The net ID
+        Output:
+        - returns the cell IDs of the cone sorted by level
+        """
+        cone = set()
+        stack = [net]
+        while len(stack) > 0:
+            net = stack.pop()
+            for j in range(self.fanoutStart[net], self.fanoutStart[net + 1]):
+                c = self.fanoutCells[j]
+                if c not in cone:
+                    cone.add(c)
+                    stack.extend(self.outNets[self.outStart[c]:self.outStart[c + 1]])
+        return sorted(cone, key=self.levels.__getitem__)
+
+    def faninCone(self, nets):
+        """
+        A function that finds the cells in the transitive fanin of some nets
+        Input:
+        - nets: The net IDs
+        Output:
+        - returns the cell IDs of the cone sorted by level
+        """
+        cone = set()
+        stack = list(nets)
+        while len(stack) > 0:
+            c = self.drivers[stack.pop()]
+            if c != -1 and c not in cone:
+                cone.add(c)
+                stack.extend(self.faninNets[self.faninStart[c]:self.faninStart[c + 1]])
+        return sorted(cone, key=self.levels.__getitem__)
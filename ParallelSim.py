@@ -0,0 +1,211 @@
+import multiprocessing
+import time
+from collections import deque
+
+# The netlist, the batch size and the input columns of a worker process, set by initWorker,
+# see workerPool
+workerState = None
+
+
+def workerPool(workers, initializer=None, initArgs=()):
+    """
+    Start a process pool whose workers are set up by initializer(*initArgs)
+    With fork the initializer runs once in the parent and its module state is shared
+    copy-on-write with the workers, otherwise it runs in every worker
+    Input:
+    - workers: The number of processes
+    - initializer: The function that sets up the state of a worker, if not None
+    - initArgs: The arguments of the initializer
+    Output:
+    - returns the multiprocessing Pool
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        if initializer is not None:
+            initializer(*initArgs)
+        return multiprocessing.get_context("fork").Pool(workers)
+    return multiprocessing.Pool(workers, initializer, initArgs)
+
+
+def packWords(batch, columns=None):
+    """
+    Pack a batch of vectors into words, bit k of a word is the value in the k-th vector
+    Input:
+    - batch: The vectors as strings of 0 / 1
+    - columns: The positions of the inputs to pack, all of them if None
+    Output:
+    - returns the word of each input and the word with the bit of every vector set
+    """
+    if columns is None:
+        columns = range(len(batch[0]))
+    words = [int("".join(v[k] for v in reversed(batch)), 2) for k in columns]
+    return words, (1 << len(batch)) - 1
+
+
+def unpackRows(values, outputIds, size):
+    """
+    Unpack the output words of a batch into one row per vector
+    Input:
+    - values: The packed word of each net
+    - outputIds: The nets of the outputs
+    - size: The number of vectors of the batch
+    Output:
+    - returns the output rows of the batch
+    """
+    columns = [bin(values[net])[2:].zfill(size)[::-1] for net in outputIds]
+    return [[int(b) for b in row] for row in zip(*columns)]
+
+
+def simulateWords(netlist, batch, columns=None):
+    """
+    Simulate a batch of vectors bit-parallel
+    Input:
+    - netlist: The Netlist to simulate
+    - batch: The vectors as strings of 0 / 1
+    - columns: The positions in the vectors of the inputs of the netlist, all if None
+    Output:
+    - returns the output rows of the batch
+    """
+    words, ones = packWords(batch, columns)
+    return unpackRows(netlist.evaluateWords(words, ones), netlist.outputIds, len(batch))
+
+
+def initWorker(netlist, batchSize, columns=None):
+    """
+    Set up the state of a worker
+    Input:
+    - netlist: The Netlist to simulate
+    - batchSize: The number of vectors packed in a word
+    - columns: The positions in the vectors of the inputs of the netlist, all if None
+    """
+    global workerState
+    workerState = (netlist, batchSize, columns)
+
+
+def simulateChunk(chunk):
+    """
+    Simulate a chunk of vectors in a worker
+    Input:
+    - chunk: The vectors as strings of 0 / 1
+    Output:
+    - returns the output rows of the chunk
+    """
+    netlist, batchSize, columns = workerState
+    rows = []
+    for start in range(0, len(chunk), batchSize):
+        rows.extend(simulateWords(netlist, chunk[start:start + batchSize], columns))
+    return rows
+
+
+class Progress:
+    """
+    A class for the progress and throughput of a parallel simulation
+
+    It is updated as the chunks are merged, so it can be read from another
+    thread while the simulation runs
+
+    Attributes:
+    - vectors: The number of simulated vectors merged so far
+    - chunks: The number of merged chunks
+    - start: The perf_counter time of the start, None before the start
+    - seconds: The time since the start, frozen at the end
+    - done: Whether the simulation has finished
+    - callback: A function called with the Progress after each chunk, if not None
+
+    Functions:
+    - Private:
+        - __init__
+    - Public:
+        - begin
+        - update
+        - finish
+        - rate
+    """
+
+    def __init__(self, callback=None):
+        """
+        Input:
+        - callback: A function called with the Progress after each chunk
+        """
+        self.vectors = 0
+        self.chunks = 0
+        self.start = None
+        self.seconds = 0.0
+        self.done = False
+        self.callback = callback
+
+    def begin(self):
+        """
+        A function that starts the clock
+        """
+        self.start = time.perf_counter()
+
+    def update(self, vectors):
+        """
+        A function that records a merged chunk
+        Input:
+        - vectors: The number of vectors of the chunk
+        """
+        self.vectors += vectors
+        self.chunks += 1
+        self.seconds = time.perf_counter() - self.start
+        if self.callback is not None:
+            self.callback(self)
+
+    def finish(self):
+        """
+        A function that stops the clock
+        """
+        self.seconds = time.perf_counter() - self.start
+        self.done = True
+
+    @property
+    def rate(self):
+        """
+        The throughput in vectors per second
+        """
+        return self.vectors / self.seconds if self.seconds > 0 else 0.0
+
+
+def simulateSharded(netlist, chunks, workers=None, batchSize=4096, progress=None, columns=None):
+    """
+    Simulate a stream of vector chunks across a process pool, keeping the order of the chunks
+    Only a few chunks per worker are in flight, so the stream is never read ahead into memory
+    Input:
+    - netlist: The Netlist to simulate
+    - chunks: An iterable of chunks, each a list of vectors as strings of 0 / 1
+    - workers: The number of processes, all the cores if None, in-process if 1
+    - batchSize: The number of vectors packed in a word
+    - progress: The Progress to update, if not None
+    - columns: The positions in the vectors of the inputs of the netlist, all if None
+    Output:
+    - yields the output rows of each chunk, in the order of the chunks
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if progress is not None:
+        progress.begin()
+    if workers == 1:
+        initWorker(netlist, batchSize, columns)
+        for chunk in chunks:
+            rows = simulateChunk(chunk)
+            if progress is not None:
+                progress.update(len(rows))
+            yield rows
+    else:
+        with workerPool(workers, initWorker, (netlist, batchSize, columns)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(simulateChunk, (chunk,)))
+                # Merge the oldest chunk once every worker has two chunks queued
+                if len(pending) >= 2 * workers:
+                    rows = pending.popleft().get()
+                    if progress is not None:
+                        progress.update(len(rows))
+                    yield rows
+            while len(pending) > 0:
+                rows = pending.popleft().get()
+                if progress is not None:
+                    progress.update(len(rows))
+                yield rows
+    if progress is not None:
+        progress.finish()
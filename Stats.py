@@ -0,0 +1,136 @@
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+
+
+class Stats:
+    """
+    A class for the timers and counters of the instrumented phases of a Graph
+
+    A Graph only records into a Stats object when one is given, so the
+    instrumentation costs nothing when it is disabled
+
+    Attributes:
+    - timers: The phase -> [calls, seconds] of each timed phase
+    - counters: The name -> count of each counter
+    - cellEvaluations: The cell type -> number of cell evaluations
+    - profiler: The cProfile.Profile enabled inside the timed phases, None if not profiling
+
+    Functions:
+    - Private:
+        - __init__
+    - Public:
+        - timer
+        - count
+        - countCells
+        - toDict
+        - dumpJson
+        - dumpProfile
+        - summary
+    """
+
+    def __init__(self, profile=False):
+        """
+        Input:
+        - profile: Also run cProfile inside the timed phases
+        """
+        self.timers = {}
+        self.counters = {}
+        self.cellEvaluations = {}
+        self.profiler = cProfile.Profile() if profile else None
+        self.__depth = 0
+
+    @contextmanager
+    def timer(self, name):
+        """
+        A function that times a phase, nested phases are timed on their own as well
+        Input:
+        - name: The name of the phase
+        """
+        # The profiler is only switched on by the outermost phase
+        if self.profiler is not None and self.__depth == 0:
+            self.profiler.enable()
+        self.__depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.__depth -= 1
+            if self.profiler is not None and self.__depth == 0:
+                self.profiler.disable()
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+
+    def count(self, name, n=1):
+        """
+        A function that adds to a counter
+        Input:
+        - name: The name of the counter
+        - n: The amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def countCells(self, cellType, n):
+        """
+        A function that adds to the evaluations of a cell type
+        Input:
+        - cellType: The cell type (CFG4, ARI1, INBUF, ...)
+        - n: The number of evaluations
+        """
+        self.cellEvaluations[cellType] = self.cellEvaluations.get(cellType, 0) + n
+
+    def toDict(self):
+        """
+        A function that gives the recorded data
+        Output:
+        - returns the timers, counters and cell evaluations as a dict
+        """
+        return {
+            "timers": {name: {"calls": calls, "seconds": seconds}
+                       for name, (calls, seconds) in self.timers.items()},
+            "counters": dict(self.counters),
+            "cellEvaluations": dict(self.cellEvaluations)
+        }
+
+    def dumpJson(self, path):
+        """
+        A function that writes the recorded data as JSON
+        Input:
+        - path: The path of the .json file
+        """
+        with open(path, "w") as fp:
+            json.dump(self.toDict(), fp, indent=2)
+            fp.write("\n")
+
+    def dumpProfile(self, path):
+        """
+        A function that writes the cProfile data, to be read with pstats or snakeviz
+        Input:
+        - path: The path of the .prof file
+        """
+        if self.profiler is None:
+            raise ValueError("The stats were not recorded with profile=True.")
+        self.profiler.dump_stats(path)
+
+    def summary(self):
+        """
+        A function that formats the recorded data as a table
+        Output:
+        - returns the table
+        """
+        lines = [f"{'phase':<24}{'calls':>8}{'ms':>12}"]
+        for name, (calls, seconds) in self.timers.items():
+            lines.append(f"{name:<24}{calls:>8}{seconds * 1e3:>12.2f}")
+        lines.append("")
+        lines.append(f"{'counter':<24}{'count':>20}")
+        for name, n in self.counters.items():
+            lines.append(f"{name:<24}{n:>20}")
+        if len(self.cellEvaluations) > 0:
+            lines.append("")
+            lines.append(f"{'cell evaluations':<24}{'count':>20}")
+            for name, n in sorted(self.cellEvaluations.items()):
+                lines.append(f"{name:<24}{n:>20}")
+        return "\n".join(lines)
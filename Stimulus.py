@@ -0,0 +1,227 @@
+import os
+import struct
+
+# Stimulus and response file formats
+# text   | One vector per line as 0 / 1, blank lines and lines starting with # or // are skipped
+# binary | binaryMagic, the width as a little-endian uint32, then one record of
+#          ceil(width / 8) bytes per vector, bit i of the vector is bit i % 8 of byte i // 8
+# npy    | A 2-D NumPy array of 0 / 1, one row per vector, read memory-mapped
+stimulusFormats = ("text", "binary", "npy")
+binaryMagic = b"NLVB"
+# The number of vectors converted at a time, the memory does not depend on the file size
+blockVectors = 4096
+# The .npy header is written with room for any row count and filled in on close
+npyHeaderBytes = 128
+
+
+def stimulusFormat(path):
+    """
+    Get the format of a stimulus or response file from its extension
+    Input:
+    - path: Path of the file
+    Output:
+    - returns npy for .npy, binary for .bin, text otherwise
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return "npy"
+    if extension == ".bin":
+        return "binary"
+    return "text"
+
+
+def readVectors(source):
+    """
+    Read the input vectors from a file, one vector per line
+    Blank lines and lines starting with # or // are skipped
+    Input:
+    - source: Path of the vector file or an open file
+    Output:
+    - yields the vectors as strings
+    """
+    if isinstance(source, str):
+        with open(source, "r") as fp:
+            yield from readVectors(fp)
+        return
+    for line in source:
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#") or line.startswith("//"):
+            continue
+        yield line
+
+
+def readBinary(source):
+    """
+    Read the vectors of a packed binary file lazily
+    Input:
+    - source: Path of the file or an open binary file
+    Output:
+    - yields the vectors as strings of 0 / 1
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as fp:
+            yield from readBinary(fp)
+        return
+    header = source.read(len(binaryMagic) + 4)
+    if header[:len(binaryMagic)] != binaryMagic or len(header) != len(binaryMagic) + 4:
+        raise ValueError("Not a packed binary vector file.")
+    width = struct.unpack("<I", header[len(binaryMagic):])[0]
+    if width == 0:
+        raise ValueError("The packed binary vector file has no bits per vector.")
+    size = (width + 7) // 8
+    while True:
+        block = source.read(size * blockVectors)
+        if len(block) % size != 0:
+            raise ValueError("The packed binary vector file is truncated.")
+        for start in range(0, len(block), size):
+            value = int.from_bytes(block[start:start + size], "little")
+            yield format(value, f"0{size * 8}b")[::-1][:width]
+        if len(block) < size * blockVectors:
+            return
+
+
+def readNpy(path):
+    """
+    Read the rows of a .npy file lazily, the file is memory-mapped
+    Input:
+    - path: Path of the .npy file
+    Output:
+    - yields the vectors as strings of 0 / 1
+    """
+    # NumPy is only needed for this format, so it is imported here
+    import numpy as np
+    array = np.load(path, mmap_mode="r")
+    if array.ndim != 2:
+        raise ValueError("The .npy stimulus must be a 2-D array, one row per vector.")
+    if array.shape[1] == 0:
+        raise ValueError("The .npy stimulus has no bits per vector.")
+    for start in range(0, array.shape[0], blockVectors):
+        block = np.ascontiguousarray(array[start:start + blockVectors] != 0, dtype=np.uint8)
+        text = (block + ord("0")).tobytes().decode()
+        width = block.shape[1]
+        for i in range(0, len(text), width):
+            yield text[i:i + width]
+
+
+def readStimulus(source, fmt=None):
+    """
+    Read the input vectors of a stimulus file lazily
+    Input:
+    - source: Path of the file, or an open file for the text and binary formats
+    - fmt: text / binary / npy, from the extension of the path if None
+    Output:
+    - yields the vectors as strings of 0 / 1 in the order of dataTypes["input"]
+    """
+    if fmt is None:
+        fmt = stimulusFormat(source) if isinstance(source, str) else "text"
+    if fmt == "text":
+        return readVectors(source)
+    if fmt == "binary":
+        return readBinary(source)
+    if fmt == "npy":
+        return readNpy(source)
+    raise ValueError(f"Unknown stimulus format {fmt}.")
+
+
+class ResponseWriter:
+    """
+    A class that writes vectors incrementally in the text, binary or npy format
+
+    Attributes:
+    - fp: The file written to
+    - fmt: text / binary / npy
+    - width: The number of bits of a vector
+    - rows: The number of vectors written
+
+    Functions:
+    - Private:
+        - __init__
+        - __npyHeader
+    - Public:
+        - write
+        - writeRows
+        - close
+    """
+
+    def __init__(self, target, width, fmt=None):
+        """
+        Input:
+        - target: Path of the file, or an open file for the text and binary formats
+        - width: The number of bits of a vector, e.g. the number of outputs
+        - fmt: text / binary / npy, from the extension of the path if None
+        """
+        if fmt is None:
+            fmt = stimulusFormat(target) if isinstance(target, str) else "text"
+        if fmt not in stimulusFormats:
+            raise ValueError(f"Unknown response format {fmt}.")
+        self.fmt = fmt
+        self.width = width
+        self.rows = 0
+        self.__owned = isinstance(target, str)
+        if self.__owned:
+            self.fp = open(target, "w" if fmt == "text" else "wb")
+        else:
+            self.fp = target
+        if fmt == "binary":
+            self.fp.write(binaryMagic + struct.pack("<I", width))
+        elif fmt == "npy":
+            # The row count is only known at the end, the header is rewritten on close
+            self.fp.write(self.__npyHeader(0))
+
+    def __npyHeader(self, rows):
+        """
+        A function that builds the .npy header of a uint8 array, padded to npyHeaderBytes
+        Input:
+        - rows: The number of rows of the array
+        Output:
+        - returns the header
+        """
+        header = "{'descr': '|u1', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, self.width)
+        header = header.ljust(npyHeaderBytes - 10 - 1) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+    def write(self, row):
+        """
+        A function that writes one vector
+        Input:
+        - row: The vector as a string of 0 / 1 or a sequence of bits
+        """
+        bits = row if isinstance(row, str) else "".join(str(int(b)) for b in row)
+        if len(bits) != self.width or bits.strip("01") != "":
+            raise ValueError(f"Vector {row!r} is not a {self.width} bit vector.")
+        if self.fmt == "text":
+            self.fp.write(bits + "\n")
+        elif self.fmt == "binary":
+            size = (self.width + 7) // 8
+            self.fp.write(int(bits[::-1], 2).to_bytes(size, "little") if self.width > 0 else b"")
+        else:
+            self.fp.write(bytes(int(b) for b in bits))
+        self.rows += 1
+
+    def writeRows(self, rows):
+        """
+        A function that writes vectors
+        Input:
+        - rows: An iterable of vectors
+        """
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        """
+        A function that completes the file and closes it if it was opened here
+        """
+        if self.fmt == "npy":
+            self.fp.seek(0)
+            self.fp.write(self.__npyHeader(self.rows))
+            self.fp.seek(0, os.SEEK_END)
+        if self.__owned:
+            self.fp.close()
+        else:
+            self.fp.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,83 @@
+from Netlist import portOrder
+
+# Truth tables of the voter cells
+# AND2: Y = A & B
+# OR3: Y = A | B | C
+and2Init = 0x8
+or3Init = 0xFE
+
+
+def uniqueName(base, taken):
+    """
+    Get a name that is not taken yet and reserve it
+    Input:
+    - base: The preferred name
+    - taken: The set of the names in use, updated in place
+    Output:
+    - returns base, or base with the first free numeric suffix
+    """
+    name = base
+    k = 0
+    while name in taken:
+        k += 1
+        name = f"{base}_{k}"
+    taken.add(name)
+    return name
+
+
+def triplicate(cellTypes, ports, truthTables, nodes):
+    """
+    Apply the triple mode redundancy (TMR) approach to the cells of a netlist, in place
+    Each selected cell is replaced by three copies and each net it drives gets one
+    majority voter of three AND2 and one OR3 cells, which drives the original net
+    Input:
+    - cellTypes: The cell -> cell type of every instance
+    - ports: The cell -> {port: net} connections of every instance
+    - truthTables: The cell -> truth table decoded from the defparams
+    - nodes: The cells to triplicate
+    Output:
+    - roles: The new cell -> role (copy, and, or) of the added cells
+    - sources: The copy -> triplicated cell of each copy
+    """
+    nodes = list(dict.fromkeys(nodes))
+    for node in nodes:
+        if node not in cellTypes:
+            raise ValueError("Module not in the file.")
+    roles = {}
+    sources = {}
+    # The generated names must not clash with the cells and nets of the netlist
+    takenCells = set(cellTypes)
+    takenNets = {net for connections in ports.values() for net in connections.values()}
+    for node in nodes:
+        cellType = cellTypes.pop(node)
+        connections = ports.pop(node)
+        table = truthTables.pop(node, None)
+        outPorts = portOrder[cellType][1]
+        copies = {port: [uniqueName(f"{connections[port]}_tmr{k}", takenNets) for k in range(3)]
+                  for port in outPorts if port in connections}
+        # The three copies drive their own version of the output nets
+        for k in range(3):
+            copy = uniqueName(f"{node}_{k}", takenCells)
+            cellTypes[copy] = cellType
+            ports[copy] = {port: copies[port][k] if port in copies else net
+                           for port, net in connections.items()}
+            if table is not None:
+                truthTables[copy] = table
+            roles[copy] = "copy"
+            sources[copy] = node
+        # One voter per driven net
+        for port, tmr in copies.items():
+            net = connections[port]
+            votes = [uniqueName(f"{net}_vote{k}", takenNets) for k in range(3)]
+            for k in range(3):
+                andGate = uniqueName(f"{net}_and{k}", takenCells)
+                cellTypes[andGate] = "CFG2"
+                ports[andGate] = {"A": tmr[k], "B": tmr[(k + 1) % 3], "Y": votes[k]}
+                truthTables[andGate] = and2Init
+                roles[andGate] = "and"
+            orGate = uniqueName(f"{net}_or", takenCells)
+            cellTypes[orGate] = "CFG3"
+            ports[orGate] = {"A": votes[0], "B": votes[1], "C": votes[2], "Y": net}
+            truthTables[orGate] = or3Init
+            roles[orGate] = "or"
+    return roles, sources
@@ -0,0 +1,216 @@
+import json
+from collections import Counter
+
+from Netlist import typeNames
+
+# The delay of a cell type missing from the delay table, every cell is one level by default
+defaultDelay = 1.0
+
+
+def readDelays(path):
+    """
+    Read a delay table from a JSON file
+    Input:
+    - path: Path of the .json file, a cell type -> delay object, e.g. {"CFG4": 0.4, "ARI1": 0.6}
+    Output:
+    - returns the cell type -> delay table
+    """
+    with open(path) as fp:
+        delays = json.load(fp)
+    for cellType, delay in delays.items():
+        if cellType not in typeNames:
+            raise ValueError(f"Unknown cell type {cellType} in the delay table.")
+        if not isinstance(delay, (int, float)) or delay < 0:
+            raise ValueError(f"The delay of {cellType} must be a non-negative number.")
+    return delays
+
+
+class TimingReport:
+    """
+    A class for the static depth and timing analysis of a Netlist
+
+    The nets are analyzed in one pass over the cells in evaluation order, a fused carry
+    chain is walked cell by cell. The level of a net is the number of cells on the longest
+    path from a primary input to it, its arrival is the sum of the delays of those cells
+
+    Attributes:
+    - netlist: The analyzed Netlist
+    - delays: The cell type -> delay table, None for unit delays
+    - levels: The logic level of each net
+    - arrivals: The arrival time of each net, the levels for unit delays
+    - previous: The input net of the driver on the critical path to each net, -1 for the
+        nets without a driver
+    - depth: The highest level of the nets
+    - criticalPaths: The output -> {level, arrival, startpoint, cells} of the latest path
+        to each primary output
+    - fanoutHistogram: The number of readers -> number of nets, over the driven and input nets
+    - cellCounts: The cell type -> number of cells
+    - baseline: The TimingReport this one is compared with, e.g. before TMR, None if none
+
+    Functions:
+    - Private:
+        - __init__
+        - __analyze
+        - __criticalPath
+    - Public:
+        - toDict
+        - dumpJson
+        - summary
+    """
+
+    def __init__(self, netlist, delays=None, baseline=None):
+        """
+        Input:
+        - netlist: The Netlist to analyze
+        - delays: The cell type -> delay table, None for unit delays
+        - baseline: The TimingReport to compare with, None if none
+        """
+        self.netlist = netlist
+        self.delays = delays
+        self.baseline = baseline
+        self.__analyze()
+        self.criticalPaths = {netlist.netNames[net]: self.__criticalPath(net)
+                              for net in netlist.outputIds}
+        self.depth = max(self.levels) if len(self.levels) > 0 else 0
+        fanouts = netlist.fanoutStart
+        inputs = set(netlist.inputIds)
+        self.fanoutHistogram = dict(sorted(Counter(
+            fanouts[net + 1] - fanouts[net] for net in range(2, len(netlist.netNames))
+            if netlist.drivers[net] != -1 or net in inputs).items()))
+        self.cellCounts = dict(sorted(Counter(typeNames[t] for t in netlist.types).items()))
+
+    def __analyze(self):
+        """
+        A function that computes the level, the arrival and the critical input of every net
+        """
+        netlist = self.netlist
+        nets = len(netlist.netNames)
+        types = netlist.types
+        faninStart, faninNets = netlist.faninStart, netlist.faninNets
+        outStart, outNets = netlist.outStart, netlist.outNets
+        drivers, chainNext = netlist.drivers, netlist.chainNext
+        if self.delays is None:
+            delay = [1] * len(typeNames)
+        else:
+            delay = [self.delays.get(name, defaultDelay) for name in typeNames]
+        levels = [0] * nets
+        arrivals = [0] * nets
+        previous = [-1] * nets
+        for c in netlist.order:
+            # A fused carry chain appears once in the order, as its first cell
+            while c != -1:
+                level = 0
+                arrival = 0
+                latest = -1
+                for i in range(faninStart[c], faninStart[c + 1]):
+                    net = faninNets[i]
+                    if levels[net] > level:
+                        level = levels[net]
+                    if latest == -1 or arrivals[net] > arrival:
+                        arrival = arrivals[net]
+                        latest = net
+                level += 1
+                arrival += delay[types[c]]
+                for i in range(outStart[c], outStart[c + 1]):
+                    net = outNets[i]
+                    if drivers[net] == c:
+                        levels[net] = level
+                        arrivals[net] = arrival
+                        previous[net] = latest
+                c = chainNext[c]
+        self.levels = levels
+        self.arrivals = arrivals
+        self.previous = previous
+
+    def __criticalPath(self, net):
+        """
+        A function that traces the latest path back from a net to a primary input
+        Input:
+        - net: The net ID
+        Output:
+        - returns the level, arrival, startpoint and cells of the path
+        """
+        netlist = self.netlist
+        cells = []
+        end = net
+        while net != -1 and netlist.drivers[net] != -1:
+            cells.append(netlist.cellNames[netlist.drivers[net]])
+            net = self.previous[net]
+        cells.reverse()
+        return {
+            "level": self.levels[end],
+            "arrival": self.arrivals[end],
+            "startpoint": netlist.netNames[net] if net != -1 else None,
+            "cells": cells
+        }
+
+    def toDict(self):
+        """
+        A function that gives the report
+        Output:
+        - returns the depth, the level of every net, the critical paths, the histograms and
+            the change from the baseline as a dict
+        """
+        # The dangling nets of unconnected outputs are not named nets
+        nets = [(name, net) for name, net in self.netlist.netIds.items() if net > 1]
+        report = {
+            "depth": self.depth,
+            "delays": self.delays,
+            "netLevels": {name: self.levels[net] for name, net in nets},
+            "criticalPaths": self.criticalPaths,
+            "fanoutHistogram": self.fanoutHistogram,
+            "cellCounts": self.cellCounts
+        }
+        if self.delays is not None:
+            report["netArrivals"] = {name: self.arrivals[net] for name, net in nets}
+        if self.baseline is not None:
+            report["baseline"] = {
+                "depth": self.baseline.depth,
+                "cellCounts": self.baseline.cellCounts,
+                "levels": {name: path["level"]
+                           for name, path in self.baseline.criticalPaths.items()},
+                "arrivals": {name: path["arrival"]
+                             for name, path in self.baseline.criticalPaths.items()}
+            }
+        return report
+
+    def dumpJson(self, path):
+        """
+        A function that writes the report as JSON
+        Input:
+        - path: The path of the .json file
+        """
+        with open(path, "w") as fp:
+            json.dump(self.toDict(), fp, indent=2)
+            fp.write("\n")
+
+    def summary(self):
+        """
+        A function that formats the report as tables, with the cells of the worst path only
+        Output:
+        - returns the tables
+        """
+        compare = self.baseline is not None
+        base = self.baseline.criticalPaths if compare else {}
+        lines = [f"depth {self.depth}" + (f" (was {self.baseline.depth})" if compare else "")]
+        lines.append("")
+        lines.append(f"{'output':<24}{'level':>8}{'arrival':>10}{'was':>10}  startpoint")
+        for name, path in self.criticalPaths.items():
+            was = f"{base[name]['arrival']:g}" if name in base else "-"
+            lines.append(f"{name:<24}{path['level']:>8}{path['arrival']:>10g}{was:>10}  "
+                         f"{path['startpoint']}")
+        if len(self.criticalPaths) > 0:
+            name, path = max(self.criticalPaths.items(), key=lambda item: item[1]["arrival"])
+            lines.append("")
+            lines.append(f"critical path to {name}: {path['startpoint']} -> " +
+                         " -> ".join(path["cells"]))
+        lines.append("")
+        lines.append(f"{'cell type':<24}{'cells':>8}" + (f"{'was':>10}" if compare else ""))
+        for cellType, n in self.cellCounts.items():
+            was = f"{self.baseline.cellCounts.get(cellType, 0):>10}" if compare else ""
+            lines.append(f"{cellType:<24}{n:>8}{was}")
+        lines.append("")
+        lines.append(f"{'fanout':<24}{'nets':>8}")
+        for fanout, n in self.fanoutHistogram.items():
+            lines.append(f"{fanout:<24}{n:>8}")
+        return "\n".join(lines)
@@ -1,13 +1,219 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from Batch import designFiles, runBatch
+from Cache import defaultCacheDir
 from Graph import Graph
+from Stimulus import readStimulus, readVectors, stimulusFormats
+from Stats import Stats
+from Timing import readDelays
+
+
+def parseArgs():
+    """
+    A function that parses the command line arguments
+    Output:
+    - returns the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="NetList Viewer and Simulator. Runs interactively when no file is given.")
+    parser.add_argument("file", nargs="?",
+                        help="path of the .vm file")
+    parser.add_argument("-v", "--vectors", default="-",
+                        help="vector file with one vector per line, or a packed .bin or .npy "
+                             "file, - for stdin (default: -)")
+    parser.add_argument("-f", "--format", choices=["csv", "json"] + list(stimulusFormats),
+                        default="csv",
+                        help="format of the simulation results, text / binary / npy are "
+                             "streamed with constant memory (default: csv)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file for the simulation results, - for stdout (default: -)")
+    parser.add_argument("-t", "--tmr", nargs="+", default=[], metavar="NODE",
+                        help="modules to triplicate with the TMR approach")
+    parser.add_argument("--tmr-type", nargs="+", default=[], metavar="TYPE",
+                        help="triplicate every module of these cell types, e.g. CFG4 ARI1")
+    parser.add_argument("--check", action="store_true",
+                        help="check that the TMR netlist is equivalent to the original")
+    parser.add_argument("-d", "--draw", nargs="?", const="png", default=None,
+                        choices=["png", "svg", "dot", "graphml"],
+                        help="draw the graph to the Output folder (default format: png)")
+    parser.add_argument("-O", "--outputs", nargs="+", default=None, metavar="OUTPUT",
+                        help="only simulate the cone of influence of these outputs")
+    parser.add_argument("-c", "--cone", nargs="+", default=None, metavar="NODE",
+                        help="only draw the cone of logic of these nodes")
+    parser.add_argument("--cache", nargs="?", const=defaultCacheDir, default=None, metavar="DIR",
+                        help=f"cache the parsed netlist in DIR (default: {defaultCacheDir})")
+    parser.add_argument("-b", "--batch", metavar="PATH",
+                        help="run every .vm file of a directory or glob and write a report "
+                             "(-f json for JSONL, csv) instead of the results of one file")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes of the batch, or of the simulation of one file "
+                             "(default: all the cores for a batch, one process for a file)")
+    parser.add_argument("-r", "--random", type=int, default=1024, metavar="N",
+                        help="number of random vectors simulated per design of the batch "
+                             "(default: 1024)")
+    parser.add_argument("--stats", nargs="?", const="-", default=None, metavar="FILE",
+                        help="record the timers and counters of the phases and write them as "
+                             "JSON to FILE (default: print the summary table)")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="profile the phases with cProfile and write the pstats data to FILE")
+    parser.add_argument("--timing", nargs="?", const="-", default=None, metavar="FILE",
+                        help="report the logic depth, the critical path of each output and the "
+                             "fanout histogram, after the TMR if any, as JSON to FILE "
+                             "(default: print the tables)")
+    parser.add_argument("--delays", default=None, metavar="FILE",
+                        help="JSON cell type -> delay table of the timing report "
+                             "(default: one unit per cell)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print the progress and the adjacency list")
+    return parser.parse_args()
+
+
+def writeResults(graph, vectors, out, fmt, fp, outputs=None):
+    """
+    A function that writes the simulation results
+    Input:
+    - graph: The simulated graph
+    - vectors: The simulated vectors as strings of 0 / 1
+    - out: The output matrix of the simulation
+    - fmt: csv or json
+    - fp: The file to write to
+    - outputs: The simulated outputs, all of them if None
+    """
+    inputs = graph.dataTypes["input"]
+    if outputs is None:
+        outputs = graph.dataTypes["output"]
+    if fmt == "csv":
+        writer = csv.writer(fp)
+        writer.writerow(inputs + outputs)
+        for vector, row in zip(vectors, out):
+            writer.writerow(list(vector) + row)
+    else:
+        results = []
+        for vector, row in zip(vectors, out):
+            results.append({
+                "inputs": dict(zip(inputs, [int(b) for b in vector])),
+                "outputs": dict(zip(outputs, row))
+            })
+        json.dump(results, fp, indent=2)
+        fp.write("\n")
+
+
+def run(args):
+    """
+    A function that constructs and simulates the given file without any prompts
+    Input:
+    - args: The parsed command line arguments
+    """
+    stats = None
+    if args.stats is not None or args.profile is not None:
+        stats = Stats(profile=args.profile is not None)
+    graph = Graph.fromFile(args.file, verbose=args.verbose, cacheDir=args.cache, stats=stats)
+    graph.construct(draw=False)
+    if args.draw is not None:
+        graph.draw(args.draw, args.cone)
+    if args.format in stimulusFormats:
+        # Stream the vectors to the responses, the vectors are never all in memory
+        source = sys.stdin if args.vectors == "-" else args.vectors
+        target = args.output
+        if args.output == "-":
+            if args.format == "npy":
+                sys.exit("The npy format needs an output file (-o).")
+            target = sys.stdout if args.format == "text" else sys.stdout.buffer
+        workers = args.jobs if args.jobs is not None and args.jobs > 1 else None
+        graph.simulateStream(source, target, outputFormat=args.format, workers=workers,
+                             outputs=args.outputs)
+    else:
+        if args.vectors == "-":
+            vectors = list(readVectors(sys.stdin))
+        else:
+            vectors = list(readStimulus(args.vectors))
+        vectors = [v.replace(",", "").replace(" ", "") for v in vectors]
+        if len(vectors) == 0:
+            out = []
+        elif args.jobs is not None and args.jobs > 1:
+            out = list(graph.simulateParallel(vectors, workers=args.jobs, outputs=args.outputs))
+        elif args.outputs is not None:
+            out = graph.simulateCone(args.outputs, vectors)
+        else:
+            out = graph.simulate(vectors)
+        if args.output == "-":
+            writeResults(graph, vectors, out, args.format, sys.stdout, args.outputs)
+        else:
+            with open(args.output, "w", newline="") as fp:
+                writeResults(graph, vectors, out, args.format, fp, args.outputs)
+    if len(args.tmr) > 0 or len(args.tmr_type) > 0:
+        graph.applyTMR(args.tmr, lambda name, mod: mod in args.tmr_type, draw=False)
+        if args.check:
+            original = Graph.fromFile(args.file, verbose=args.verbose, cacheDir=args.cache)
+            original.construct(draw=False)
+            if original.checkEquivalence(graph)["counterexample"] is not None:
+                sys.exit(1)
+        if args.draw is not None:
+            graph.draw(args.draw, args.cone, os.path.splitext(
+                os.path.basename(args.file))[0] + "_TMR")
+    if args.timing is not None:
+        delays = readDelays(args.delays) if args.delays is not None else None
+        report = graph.timingReport(delays)
+        if args.timing == "-":
+            print(report.summary(), file=sys.stderr)
+        else:
+            report.dumpJson(args.timing)
+    if stats is not None:
+        if args.stats not in (None, "-"):
+            stats.dumpJson(args.stats)
+        if args.profile is not None:
+            stats.dumpProfile(args.profile)
+        if args.stats == "-" or args.verbose:
+            print(stats.summary(), file=sys.stderr)
+
+
+def runBatchReport(args):
+    """
+    A function that runs the batch of files given by --batch and writes its report
+    Input:
+    - args: The parsed command line arguments
+    Output:
+    - returns the exit code, 1 if some design failed
+    """
+    paths = designFiles(args.batch)
+    if len(paths) == 0:
+        print(f"No .vm files found for {args.batch}", file=sys.stderr)
+        return 1
+    # A .jsonl report is always written as JSON lines
+    fmt = "json" if args.output.endswith((".jsonl", ".json")) else args.format
+    start = time.perf_counter()
+    if args.output == "-":
+        records = runBatch(paths, sys.stdout, fmt, args.random, workers=args.jobs,
+                           cacheDir=args.cache)
+    else:
+        with open(args.output, "w", newline="") as fp:
+            records = runBatch(paths, fp, fmt, args.random, workers=args.jobs,
+                               cacheDir=args.cache)
+    failed = [r["design"] for r in records if r["status"] != "ok"]
+    print(f"{len(records) - len(failed)}/{len(records)} designs ok in "
+          f"{time.perf_counter() - start:.2f}s" +
+          (f", failed: {' '.join(failed)}" if len(failed) > 0 else ""), file=sys.stderr)
+    return 1 if len(failed) > 0 else 0
 
 
 # Main driver function for the NetList Viewer and Simulator
 if __name__ == "__main__":
-    # Initialize the graph
-    graph = Graph()
-    # Construct the graph
-    graph.construct()
-    # Simulate the graph
-    graph.simulate()
-    # Simulate the TMR approach
-    graph.TMRApproach()
+    args = parseArgs()
+    if args.batch is not None:
+        sys.exit(runBatchReport(args))
+    elif args.file is None:
+        # Initialize the graph
+        graph = Graph()
+        # Construct the graph
+        graph.construct()
+        # Simulate the graph
+        graph.simulate()
+        # Simulate the TMR approach
+        graph.TMRApproach()
+    else:
+        run(args)